@@ -0,0 +1,161 @@
+"""
+Асинхронные версии частых коротких записей: избранное, корзина и подписки.
+Подключаются только при запуске под ASGI (см. foodgram/asgi_urls.py) и
+отвечают так же, как соответствующие action-методы вьюсетов.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, close_old_connections, transaction
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscribe
+from .recipe_lists import add_recipes, remove_recipes
+from .serializers import RecipeShortSerializer, SubscribeSerializer
+from .services import get_subscriptions_queryset
+
+
+User = get_user_model()
+
+
+def database_sync_to_async(func):
+    """
+    Выполняет работу с БД в потоке из пула, а не в общем потоке
+    sync_to_async, чтобы параллельные запросы не ждали друг друга.
+    Соединение потока закрывается, как после обычного запроса.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def render(data=None, status_code=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(
+        b'' if data is None else JSONRenderer().render(data),
+        status=status_code,
+        content_type=None if data is None else 'application/json',
+    )
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def handle_request(request, handler, **kwargs):
+    """
+    Аутентифицирует запрос так же, как вьюсеты, и вызывает handler.
+    Ошибки отдаются в формате обработчика исключений DRF.
+    """
+    authenticators = [
+        authenticator() for authenticator
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]
+    request = Request(request, authenticators=authenticators)
+    try:
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        return handler(request, **kwargs)
+    except (exceptions.APIException, Http404) as error:
+        headers = {}
+        if isinstance(error, (
+            exceptions.NotAuthenticated, exceptions.AuthenticationFailed
+        )) and authenticators:
+            error.status_code = status.HTTP_401_UNAUTHORIZED
+            headers['WWW-Authenticate'] = (
+                authenticators[0].authenticate_header(request)
+            )
+        response = exception_handler(error, {'request': request})
+        return render(response.data, response.status_code, headers)
+
+
+def add_recipe_to(model, request, pk):
+    recipes = add_recipes(model, request.user, [pk])
+    if not recipes:
+        return render(
+            {'errors': 'Несуществующий рецепт.'}, status.HTTP_400_BAD_REQUEST
+        )
+    if recipes[0].added:
+        return render(
+            {'errors': 'Рецепт уже добавлен!'}, status.HTTP_400_BAD_REQUEST
+        )
+    return render(
+        RecipeShortSerializer(recipes[0]).data, status.HTTP_201_CREATED
+    )
+
+
+def delete_recipe_from(model, request, pk):
+    if remove_recipes(model, request.user, [pk]):
+        return render(status_code=status.HTTP_204_NO_CONTENT)
+    return render(
+        {'errors': 'Рецепт уже удален.'}, status.HTTP_400_BAD_REQUEST
+    )
+
+
+def toggle_recipe(request, model, pk):
+    if request.method == 'POST':
+        return add_recipe_to(model, request, pk)
+    return delete_recipe_from(model, request, pk)
+
+
+def toggle_subscription(request, id):
+    author = User.objects.filter(id=id).first()
+    if author is None:
+        raise Http404
+    if request.method == 'DELETE':
+        deleted, _ = Subscribe.objects.filter(
+            user=request.user, author=author
+        ).delete()
+        if deleted:
+            return render(status_code=status.HTTP_204_NO_CONTENT)
+        return render(
+            {'errors': 'Нельзя удалить несуществующую подписку.'},
+            status.HTTP_400_BAD_REQUEST
+        )
+    serializer = SubscribeSerializer(
+        author, data=request.data, context={'request': request}
+    )
+    serializer.is_valid(raise_exception=True)
+    try:
+        with transaction.atomic():
+            Subscribe.objects.create(user=request.user, author=author)
+    except IntegrityError:
+        raise exceptions.ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                'Вы уже подписаны на этого пользователя!'
+            ]
+        })
+    limit = request.query_params.get('recipes_limit')
+    serializer.instance = get_subscriptions_queryset(
+        request.user, int(limit) if limit and limit.isdigit() else None
+    ).get(pk=author.pk)
+    return render(serializer.data, status.HTTP_201_CREATED)
+
+
+def toggle_view(handler, **handler_kwargs):
+    async def view(request, **kwargs):
+        if request.method not in ('POST', 'DELETE'):
+            response = exception_handler(
+                exceptions.MethodNotAllowed(request.method), {}
+            )
+            return render(
+                response.data, response.status_code, {'Allow': 'POST, DELETE'}
+            )
+        return await database_sync_to_async(handle_request)(
+            request, handler, **handler_kwargs, **kwargs
+        )
+    # Как и вьюсеты DRF, вьюхи аутентифицируются только токеном.
+    view.csrf_exempt = True
+    return view
+
+
+favorite = toggle_view(toggle_recipe, model=Favorite)
+shopping_cart = toggle_view(toggle_recipe, model=ShoppingCart)
+subscribe = toggle_view(toggle_subscription)
@@ -0,0 +1,112 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+AUTH_TOKEN_KEY = 'auth_token:{}'
+AUTH_TOKEN_STAMP_KEY = 'auth_token_stamp:{}'
+
+
+class TokenCache:
+    """Ограниченный по размеру LRU-кэш с временем жизни записей."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + self.ttl)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+def invalidate_tokens(*keys):
+    """
+    Убирает токены из кэша процесса и общего кэша. Без общего кэша
+    кэши других процессов устаревают не позже чем через
+    AUTH_TOKEN_CACHE_TTL секунд, с общим - сразу: вместе с юзером
+    удаляется метка, без которой запись кэша процесса не используется.
+    """
+    token_cache.delete(*keys)
+    if settings.AUTH_TOKEN_SHARED_CACHE:
+        cache.delete_many([
+            template.format(key) for key in keys
+            for template in (AUTH_TOKEN_KEY, AUTH_TOKEN_STAMP_KEY)
+        ])
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(*Token.objects.filter(
+        user_id=user_id
+    ).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену без запроса к БД на каждый запрос:
+    юзер по токену ищется в кэше процесса, затем в общем кэше
+    (если включен AUTH_TOKEN_SHARED_CACHE) и только затем в БД.
+    С общим кэшем запись кэша процесса используется, только пока
+    в общем кэше лежит та же метка, что и в записи.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = settings.AUTH_TOKEN_SHARED_CACHE
+        stamp = cache.get(AUTH_TOKEN_STAMP_KEY.format(key)) if shared else None
+        user, cached_stamp = token_cache.get(key) or (None, None)
+        if shared and (stamp is None or cached_stamp != stamp):
+            user = None
+            if stamp is not None:
+                user = cache.get(AUTH_TOKEN_KEY.format(key))
+                if user is not None:
+                    token_cache.set(key, (user, stamp))
+        if user is None:
+            user, _ = super().authenticate_credentials(key)
+            if shared:
+                stamp = uuid.uuid4().hex
+                cache.set_many({
+                    AUTH_TOKEN_KEY.format(key): user,
+                    AUTH_TOKEN_STAMP_KEY.format(key): stamp,
+                }, settings.AUTH_TOKEN_SHARED_CACHE_TIMEOUT)
+            token_cache.set(key, (user, stamp))
+        # Каждый запрос получает свою копию юзера, чтобы изменения
+        # в одном запросе не попадали в кэш.
+        user = copy.copy(user)
+        return user, Token(key=key, user=user)
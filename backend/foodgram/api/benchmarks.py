@@ -0,0 +1,238 @@
+import base64
+import math
+import statistics
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.storage import image_storage
+from users.models import User
+from .fixtures import FIXTURE_PASSWORD, get_fixture_image
+
+
+Endpoint = namedtuple(
+    'Endpoint',
+    ('name', 'method', 'path', 'budget', 'data', 'anonymous', 'cleanup'),
+    defaults=(None, False, None)
+)
+
+# Бюджет - наибольшее допустимое число SQL-запросов, включая точки
+# сохранения транзакций в тестах. Токен к началу замеров уже в кэше.
+# Число запросов не должно зависеть от размера страницы и объема данных.
+# Замеры идут с настройками по умолчанию: при кэше процесса версии кэшей
+# хранятся в БД, и бюджет включает чтение версий после CACHE_VERSIONS_TTL
+# и их запись при изменениях.
+ENDPOINTS = (
+    Endpoint('tags-list', 'get', '/api/tags/', 1, anonymous=True),
+    Endpoint('tags-detail', 'get', '/api/tags/{tag}/', 1, anonymous=True),
+    Endpoint(
+        'ingredients-list', 'get', '/api/ingredients/', 1, anonymous=True
+    ),
+    Endpoint(
+        'ingredients-search', 'get', '/api/ingredients/?name={prefix}', 1,
+        anonymous=True
+    ),
+    Endpoint(
+        'ingredients-detail', 'get', '/api/ingredients/{ingredient}/', 1,
+        anonymous=True
+    ),
+    Endpoint('recipes-list', 'get', '/api/recipes/', 5),
+    Endpoint('recipes-list-page', 'get', '/api/recipes/?limit=50', 5),
+    Endpoint(
+        'recipes-list-anonymous', 'get', '/api/recipes/', 6, anonymous=True
+    ),
+    Endpoint(
+        'recipes-list-tags', 'get',
+        '/api/recipes/?tags={tag_slug}&is_favorited=1', 6
+    ),
+    Endpoint(
+        'recipes-list-cursor', 'get', '/api/recipes/?pagination=cursor', 4
+    ),
+    Endpoint('recipes-search', 'get', '/api/recipes/?search=рецепт', 5),
+    Endpoint(
+        'recipes-pantry', 'get',
+        '/api/recipes/?ingredients={pantry}&max_missing=3', 7
+    ),
+    Endpoint('recipes-detail', 'get', '/api/recipes/{recipe}/', 5),
+    Endpoint('recipes-similar', 'get', '/api/recipes/{recipe}/similar/', 2),
+    Endpoint('recipes-changes', 'get', '/api/recipes/changes/', 6),
+    Endpoint('recipes-feed', 'get', '/api/recipes/feed/', 6),
+    Endpoint(
+        'recipes-download-shopping-cart', 'get',
+        '/api/recipes/download_shopping_cart/', 3
+    ),
+    Endpoint(
+        'recipes-shopping-cart-summary', 'get',
+        '/api/recipes/shopping_cart/summary/', 1
+    ),
+    Endpoint(
+        'recipes-create', 'post', '/api/recipes/', 28,
+        data={
+            'name': 'Рецепт для замера',
+            'text': 'Описание',
+            'image': '{image}',
+            'cooking_time': 10,
+            'tags': ['{tag}'],
+            'ingredients': [{'id': '{ingredient}', 'amount': 5}],
+        },
+        cleanup='/api/recipes/{id}/'
+    ),
+    Endpoint(
+        'recipes-update', 'patch', '/api/recipes/{own_recipe}/', 12,
+        data={'cooking_time': 15}
+    ),
+    Endpoint('recipes-favorite', 'post', '/api/recipes/{recipe}/favorite/', 4),
+    Endpoint(
+        'recipes-unfavorite', 'delete', '/api/recipes/{recipe}/favorite/', 3
+    ),
+    Endpoint(
+        'recipes-shopping-cart', 'post',
+        '/api/recipes/{recipe}/shopping_cart/', 11
+    ),
+    Endpoint(
+        'recipes-shopping-cart-delete', 'delete',
+        '/api/recipes/{recipe}/shopping_cart/', 10
+    ),
+    Endpoint(
+        'recipes-favorite-batch', 'post', '/api/recipes/favorite/', 4,
+        data={'recipes': '{batch}'}
+    ),
+    Endpoint(
+        'recipes-unfavorite-batch', 'delete', '/api/recipes/favorite/', 3,
+        data={'recipes': '{batch}'}
+    ),
+    Endpoint(
+        'recipes-cart-batch', 'post', '/api/recipes/shopping_cart/', 11,
+        data={'recipes': '{batch}'}
+    ),
+    Endpoint(
+        'recipes-cart-batch-delete', 'delete', '/api/recipes/shopping_cart/',
+        10, data={'recipes': '{batch}'}
+    ),
+    Endpoint('users-list', 'get', '/api/users/', 2),
+    Endpoint('users-detail', 'get', '/api/users/{author}/', 1),
+    Endpoint('users-me', 'get', '/api/users/me/', 0),
+    Endpoint('users-subscriptions', 'get', '/api/users/subscriptions/', 3),
+    Endpoint(
+        'users-subscribe', 'post', '/api/users/{author}/subscribe/', 10
+    ),
+    Endpoint(
+        'users-unsubscribe', 'delete', '/api/users/{author}/subscribe/', 8
+    ),
+    Endpoint(
+        'auth-token-login', 'post', '/api/auth/token/login/', 3,
+        data={'email': '{email}', 'password': FIXTURE_PASSWORD},
+        anonymous=True
+    ),
+)
+
+
+def get_benchmark_context():
+    """
+    Объекты для подстановки в адреса эндпоинтов. Замеры ведутся от имени
+    автора с наибольшим числом рецептов из сгенерированных данных.
+    """
+    user = User.objects.filter(
+        username__startswith='fixture_'
+    ).order_by('-recipes_count').first()
+    if user is None:
+        raise ValueError('Нет данных: выполните generate_fixture_data.')
+    recipes = list(Recipe.objects.exclude(author=user).exclude(
+        favorites__user=user
+    ).exclude(shopping_recipe__user=user).values_list('id', flat=True)[:21])
+    author = User.objects.filter(recipes_count__gt=0).exclude(
+        id=user.id
+    ).exclude(owner__user=user).first()
+    tag = Tag.objects.first()
+    ingredient = Ingredient.objects.first()
+    with image_storage.open(get_fixture_image(), 'rb') as file:
+        image = file.read()
+    return {
+        'user': user,
+        'email': user.email,
+        'recipe': recipes[0],
+        'batch': recipes[1:],
+        'own_recipe': user.recipes.first().id,
+        'author': author.id,
+        'tag': tag.id,
+        'tag_slug': tag.slug,
+        'ingredient': ingredient.id,
+        'prefix': ingredient.name[:2],
+        'pantry': ','.join(map(str, Ingredient.objects.values_list(
+            'id', flat=True
+        )[:20])),
+        'image': 'data:image/png;base64,' + base64.b64encode(image).decode(),
+    }
+
+
+def format_data(data, context):
+    if isinstance(data, dict):
+        return {
+            key: format_data(value, context) for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [format_data(value, context) for value in data]
+    if isinstance(data, str) and data.startswith('{') and data.endswith('}'):
+        return context[data[1:-1]]
+    return data
+
+
+def run_benchmarks(context, repeat=1, endpoints=ENDPOINTS):
+    """
+    Выполняет запросы ко всем эндпоинтам repeat раз подряд, чтобы
+    добавление и удаление чередовались, и возвращает для каждого
+    эндпоинта код ответа, наибольшее число SQL-запросов и время ответа.
+    Первый проход не замеряется: в нем создаются версии кэшей.
+    """
+    token, _ = Token.objects.get_or_create(user=context['user'])
+    host = settings.ALLOWED_HOSTS[0]
+    clients = {
+        False: Client(
+            HTTP_HOST=host, HTTP_AUTHORIZATION=f'Token {token.key}'
+        ),
+        True: Client(HTTP_HOST=host),
+    }
+    clients[False].get('/api/users/me/')
+    measured = [([], []) for _ in endpoints]
+    for run in range(repeat + 1):
+        for endpoint, (timings, queries) in zip(endpoints, measured):
+            client = clients[endpoint.anonymous]
+            request = getattr(client, endpoint.method)
+            path = endpoint.path.format(**context)
+            data = format_data(endpoint.data, context)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if data is None:
+                    response = request(path)
+                else:
+                    response = request(
+                        path, data, content_type='application/json'
+                    )
+                duration = time.perf_counter() - started
+            if run:
+                timings.append(duration)
+                queries.append((len(captured), response.status_code))
+            if endpoint.cleanup and response.status_code < 400:
+                clients[False].delete(
+                    endpoint.cleanup.format(**response.json())
+                )
+    results = []
+    for endpoint, (timings, queries) in zip(endpoints, measured):
+        timings.sort()
+        results.append({
+            'name': endpoint.name,
+            'method': endpoint.method.upper(),
+            'path': endpoint.path.format(**context),
+            'status': max(status for _, status in queries),
+            'queries': max(count for count, _ in queries),
+            'budget': endpoint.budget,
+            'median': statistics.median(timings),
+            'p95': timings[math.ceil(len(timings) * 0.95) - 1],
+        })
+    return results
@@ -0,0 +1,73 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+
+COUNTERS = (
+    (Favorite, 'recipe', Recipe, 'favorites_count'),
+    (ShoppingCart, 'recipe', Recipe, 'carts_count'),
+    (Subscribe, 'author', User, 'followers_count'),
+    (Recipe, 'author', User, 'recipes_count'),
+)
+
+
+def change_counters(sender, instance, delta):
+    """Изменяет счетчики, которые ведутся по объектам модели sender."""
+    for source, field, model, counter in COUNTERS:
+        if source is sender:
+            change_counter(
+                model, getattr(instance, f'{field}_id'), counter, delta
+            )
+
+
+def change_counter(model, pk, counter, delta):
+    """Атомарно изменяет счетчик на delta, не опускаясь ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{counter: counter_value(counter, delta)}
+    )
+
+
+def shift_counters(sender, pks, delta):
+    """
+    Изменяет на delta одним запросом счетчики объектов pks, которые
+    ведутся по объектам модели sender. Каждый pk должен соответствовать
+    одной действительно вставленной или удаленной строке.
+    """
+    for source, field, model, counter in COUNTERS:
+        if source is sender:
+            model.objects.filter(pk__in=pks).update(
+                **{counter: counter_value(counter, delta)}
+            )
+
+
+def counter_value(counter, delta):
+    if delta > 0:
+        return F(counter) + delta
+    return Greatest(F(counter) + delta, 0)
+
+
+def count_related(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile_counters():
+    """
+    Пересчитывает все счетчики одним запросом на счетчик, обновляя
+    только разошедшиеся строки. Возвращает {счетчик: исправлено строк}.
+    """
+    fixed = {}
+    for source, field, model, counter in COUNTERS:
+        actual = count_related(source, field)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{counter: F('actual')}
+        )
+        fixed[f'{model.__name__}.{counter}'] = model.objects.filter(
+            pk__in=drifted.values('pk')
+        ).update(**{counter: actual})
+    return fixed
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscribe, User
+
+
+def is_popular(author):
+    return author.followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out_recipes(author, recipes):
+    """
+    Раскладывает новые рецепты автора по лентам подписчиков.
+    Для популярных авторов раскладка не выполняется: их рецепты
+    подтягиваются в ленту при чтении, а автор запоминает первый
+    неразложенный рецепт, чтобы подтягивать рецепты и после того,
+    как подписчиков станет меньше порога.
+    """
+    if not recipes:
+        return
+    if is_popular(author):
+        if author.feed_pull_from is None:
+            User.objects.filter(
+                pk=author.pk, feed_pull_from__isnull=True
+            ).update(feed_pull_from=min(recipe.id for recipe in recipes))
+        return
+    follower_ids = list(Subscribe.objects.filter(
+        author=author
+    ).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create([
+        FeedEntry(user_id=follower_id, recipe=recipe, author=author)
+        for follower_id in follower_ids
+        for recipe in recipes
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def backfill_feed(user, author):
+    """
+    Добавляет в ленту последние рецепты автора при подписке, в том числе
+    на популярного: его подписчиков может стать меньше порога.
+    """
+    FeedEntry.objects.bulk_create([
+        FeedEntry(user=user, recipe_id=recipe_id, author=author)
+        for recipe_id in Recipe.objects.filter(author=author).order_by(
+            '-id'
+        ).values_list('id', flat=True)[:settings.FEED_BACKFILL_SIZE]
+    ], ignore_conflicts=True)
+
+
+def prune_feed(user, author):
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def get_feed_recipe_ids(user, before=None, limit=None):
+    """
+    id рецептов ленты, начиная с самых новых.
+    Разложенные записи читаются одним проходом по индексу
+    (user, -recipe), рецепты популярных авторов и неразложенные рецепты
+    бывших популярных - по индексу (author, -id) рецептов.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+    recipe_ids = list(entries.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:limit])
+    pulled_authors = Subscribe.objects.filter(
+        Q(author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS)
+        | Q(author__feed_pull_from__isnull=False),
+        user=user,
+    ).values_list(
+        'author_id', 'author__followers_count', 'author__feed_pull_from'
+    )
+    pulled = Q()
+    for author_id, followers_count, pull_from in pulled_authors:
+        if followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS:
+            pulled |= Q(author_id=author_id)
+        else:
+            pulled |= Q(author_id=author_id, id__gte=pull_from)
+    if pulled:
+        pulled = Recipe.objects.filter(pulled)
+        if before is not None:
+            pulled = pulled.filter(id__lt=before)
+        recipe_ids = sorted(set(recipe_ids).union(pulled.order_by(
+            '-id'
+        ).values_list('id', flat=True)[:limit]), reverse=True)[:limit]
+    return recipe_ids
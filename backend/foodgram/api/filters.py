@@ -2,6 +2,14 @@ import django_filters
 from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe, Tag
+from .pantry import filter_by_pantry
+from .search import search_recipes
+
+
+RECIPE_ORDERINGS = {
+    'name': ('name', 'id'),
+    'newest': ('-id',),
+}
 
 
 class IngredientFilter(FilterSet):
@@ -19,7 +27,8 @@ class IngredientFilter(FilterSet):
 class RecipeFilter(FilterSet):
     """
     Класс фильтрации рецептов по тега, включая фильтрацию в избранном
-    и в корзине покупок.
+    и в корзине покупок, полнотекстового поиска по рецептам и подбора
+    рецептов по имеющимся ингредиентам (ingredients=1,2,3&max_missing=1).
     """
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
@@ -33,6 +42,15 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ingredients = filters.BaseInFilter(method='filter_ingredients')
+    max_missing = filters.NumberFilter(
+        method='filter_max_missing', min_value=0
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(('name', 'По названию'), ('newest', 'Сначала новые')),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -41,11 +59,30 @@ class RecipeFilter(FilterSet):
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(shopping_recipe__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        try:
+            ingredient_ids = [int(item) for item in value]
+        except ValueError:
+            return queryset.none()
+        max_missing = self.form.cleaned_data.get('max_missing') or 0
+        return filter_by_pantry(queryset, ingredient_ids, int(max_missing))
+
+    def filter_max_missing(self, queryset, name, value):
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
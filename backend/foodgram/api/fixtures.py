@@ -0,0 +1,265 @@
+import io
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from recipes.cache_versions import (INGREDIENTS_VERSION_KEY,
+                                    RECIPES_VERSION_KEY, TAGS_VERSION_KEY,
+                                    bump_cache_version)
+from recipes.changes import log_recipe_changes
+from recipes.images import acquire_images
+from recipes.models import (Favorite, FeedEntry, Ingredient,
+                            IngredientToRecipe, Recipe, ShoppingCart, Tag)
+from recipes.storage import image_storage
+from users.models import Subscribe, User
+from .counters import reconcile_counters
+from .search import build_search_document
+from .shopping_list import rebuild_shopping_lists
+
+
+FIXTURE_PASSWORD = 'fixture-password'
+FIXTURE_IMAGE = 'recipes/images/fixture.png'
+FIXTURE_UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+FIXTURE_WORDS = (
+    'нарезать', 'обжарить', 'добавить', 'посолить', 'перемешать', 'варить',
+    'запекать', 'остудить', 'подавать', 'тесто', 'соус', 'начинка', 'лук',
+    'минут', 'сковорода', 'духовка', 'кастрюля', 'масло', 'горячим',
+)
+
+
+def zipf_weights(rng, size, exponent):
+    """
+    Вероятности по закону Ципфа в случайном порядке: немногие объекты
+    получают большую часть выборок.
+    """
+    weights = 1 / np.arange(1, size + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def sample_pairs(rng, left_ids, right_ids, weights, mean, exclude=None):
+    """
+    Случайные пары (левый, правый) без повторов: каждому левому объекту
+    достается в среднем mean правых по геометрическому распределению,
+    правые выбираются с вероятностями weights.
+    """
+    pairs = []
+    sizes = np.minimum(
+        rng.geometric(1 / (mean + 1), len(left_ids)) - 1, len(right_ids)
+    )
+    for left_id, size in zip(np.asarray(left_ids).tolist(), sizes.tolist()):
+        if not size:
+            continue
+        chosen = rng.choice(right_ids, size=size, replace=False, p=weights)
+        pairs.extend(
+            (left_id, right_id) for right_id in chosen.tolist()
+            if exclude is None or (left_id, right_id) not in exclude
+        )
+    return pairs
+
+
+def get_fixture_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (230, 140, 60)).save(buffer, 'PNG')
+    return image_storage.save(
+        FIXTURE_IMAGE, ContentFile(buffer.getvalue())
+    )
+
+
+def create_users(token, count, batch_size):
+    password = make_password(FIXTURE_PASSWORD)
+    User.objects.bulk_create([
+        User(
+            username=f'fixture_{token}_{index}',
+            email=f'fixture_{token}_{index}@example.com',
+            first_name=f'Имя{index}',
+            last_name=f'Фамилия{index}',
+            password=password,
+        ) for index in range(count)
+    ], batch_size=batch_size)
+    return np.array(User.objects.filter(
+        username__startswith=f'fixture_{token}_'
+    ).values_list('id', flat=True))
+
+
+def create_tags(rng, token, count):
+    colors = set(Tag.objects.values_list('color', flat=True))
+    tags = []
+    for index in range(count):
+        color = f'#{rng.integers(0, 0xFFFFFF):06X}'
+        while color in colors:
+            color = f'#{rng.integers(0, 0xFFFFFF):06X}'
+        colors.add(color)
+        tags.append(Tag(
+            name=f'Тег {token} {index}',
+            slug=f'fixture-{token}-{index}',
+            color=color,
+        ))
+    Tag.objects.bulk_create(tags)
+    return np.array(Tag.objects.filter(
+        slug__startswith=f'fixture-{token}-'
+    ).values_list('id', flat=True))
+
+
+def get_ingredients(rng, token, count, batch_size):
+    """Ингредиенты каталога, при нехватке дополняются новыми."""
+    missing = count - Ingredient.objects.count()
+    if missing > 0:
+        Ingredient.objects.bulk_create([
+            Ingredient(
+                name=f'ингредиент {token} {index}',
+                measurement_unit=str(rng.choice(FIXTURE_UNITS)),
+            ) for index in range(missing)
+        ], batch_size=batch_size)
+    return dict(Ingredient.objects.values_list('id', 'name')[:count])
+
+
+def create_recipes(rng, token, count, user_ids, tag_ids, ingredients,
+                   batch_size):
+    """
+    Рецепты распределены по авторам по закону Ципфа, у каждого рецепта
+    1-3 тега и 3-12 ингредиентов, популярные ингредиенты встречаются чаще.
+    """
+    author_ids = rng.choice(
+        user_ids, size=count, p=zipf_weights(rng, len(user_ids), 1.1)
+    )
+    ingredient_ids = np.array(list(ingredients))
+    ingredient_weights = zipf_weights(rng, len(ingredient_ids), 0.8)
+    cooking_times = np.clip(
+        rng.lognormal(np.log(30), 0.6, count).astype(int),
+        settings.MIN_COOCK_TIME, settings.MAX_COOCK_TIME
+    )
+    image = get_fixture_image()
+    recipes, recipe_ingredients = [], []
+    for index, (author_id, cooking_time) in enumerate(
+        zip(author_ids.tolist(), cooking_times.tolist())
+    ):
+        chosen = rng.choice(
+            ingredient_ids,
+            size=min(int(rng.integers(3, 13)), len(ingredient_ids)),
+            replace=False,
+            p=ingredient_weights,
+        ).tolist()
+        name = f'Рецепт {index} {token}'
+        text = ' '.join(rng.choice(FIXTURE_WORDS, 30)).capitalize() + '.'
+        recipes.append(Recipe(
+            author_id=author_id,
+            name=name,
+            text=text,
+            image=image,
+            cooking_time=cooking_time,
+            search_document=build_search_document(
+                name, text, sorted(ingredients[pk] for pk in chosen)
+            ),
+        ))
+        recipe_ingredients.append(chosen)
+    Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+    acquire_images([image] * len(recipes))
+    recipe_ids = dict(Recipe.objects.filter(
+        name__endswith=f' {token}'
+    ).values_list('name', 'id'))
+    recipe_ids = [recipe_ids[recipe.name] for recipe in recipes]
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in rng.choice(
+            tag_ids, size=min(int(rng.integers(1, 4)), len(tag_ids)),
+            replace=False
+        ).tolist()
+    ], batch_size=batch_size)
+    IngredientToRecipe.objects.bulk_create([
+        IngredientToRecipe(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            amount=int(rng.integers(1, 500)),
+        )
+        for recipe_id, chosen in zip(recipe_ids, recipe_ingredients)
+        for ingredient_id in chosen
+    ], batch_size=batch_size)
+    return np.array(recipe_ids), author_ids
+
+
+def create_feeds(subscriptions, author_ids, recipe_ids, batch_size):
+    """Ленты подписчиков из последних рецептов их авторов."""
+    latest = {}
+    for recipe_id, author_id in sorted(
+        zip(recipe_ids.tolist(), author_ids.tolist()), reverse=True
+    ):
+        recipes = latest.setdefault(author_id, [])
+        if len(recipes) < settings.FEED_BACKFILL_SIZE:
+            recipes.append(recipe_id)
+    followers = {}
+    for _, author_id in subscriptions:
+        followers[author_id] = followers.get(author_id, 0) + 1
+    FeedEntry.objects.bulk_create([
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+        for user_id, author_id in subscriptions
+        if followers[author_id] <= settings.FEED_FANOUT_MAX_FOLLOWERS
+        for recipe_id in latest.get(author_id, ())
+    ], batch_size=batch_size)
+
+
+@transaction.atomic
+def generate_fixture_data(users=100, recipes=500, tags=8, ingredients=300,
+                          favorites=20, carts=3, subscriptions=5, seed=0,
+                          batch_size=1000):
+    """
+    Создает синтетические данные: юзеров, теги, рецепты, избранное,
+    корзины и подписки. Популярность рецептов и авторов распределена
+    по закону Ципфа, число избранного, корзин и подписок у юзера -
+    геометрически со средними favorites, carts и subscriptions.
+    Возвращает {модель: количество созданных объектов}.
+    """
+    rng = np.random.default_rng(seed)
+    token = uuid.uuid4().hex[:8]
+    user_ids = create_users(token, users, batch_size)
+    tag_ids = create_tags(rng, token, tags)
+    ingredient_names = get_ingredients(rng, token, ingredients, batch_size)
+    recipe_ids, author_ids = create_recipes(
+        rng, token, recipes, user_ids, tag_ids, ingredient_names, batch_size
+    )
+    popularity = zipf_weights(rng, len(recipe_ids), 1.0)
+    favorite_pairs = sample_pairs(
+        rng, user_ids, recipe_ids, popularity, favorites
+    )
+    Favorite.objects.bulk_create([
+        Favorite(user_id=user_id, recipe_id=recipe_id)
+        for user_id, recipe_id in favorite_pairs
+    ], batch_size=batch_size)
+    cart_pairs = sample_pairs(rng, user_ids, recipe_ids, popularity, carts)
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+        for user_id, recipe_id in cart_pairs
+    ], batch_size=batch_size)
+    authors, recipes_by_author = np.unique(author_ids, return_counts=True)
+    subscription_pairs = sample_pairs(
+        rng, user_ids, authors, recipes_by_author / recipes_by_author.sum(),
+        subscriptions,
+        exclude={(author_id, author_id) for author_id in authors.tolist()}
+    )
+    Subscribe.objects.bulk_create([
+        Subscribe(user_id=user_id, author_id=author_id)
+        for user_id, author_id in subscription_pairs
+    ], batch_size=batch_size)
+    create_feeds(subscription_pairs, author_ids, recipe_ids, batch_size)
+    # bulk_create не отправляет сигналы: счетчики и списки покупок
+    # пересчитываются, а закэшированные данные сбрасываются сменой версий.
+    reconcile_counters()
+    rebuild_shopping_lists(user_ids.tolist())
+    log_recipe_changes(recipe_ids.tolist())
+    transaction.on_commit(lambda: bump_cache_version(
+        RECIPES_VERSION_KEY, TAGS_VERSION_KEY, INGREDIENTS_VERSION_KEY
+    ))
+    return {
+        'users': len(user_ids),
+        'tags': len(tag_ids),
+        'ingredients': len(ingredient_names),
+        'recipes': len(recipe_ids),
+        'favorites': len(favorite_pairs),
+        'carts': len(cart_pairs),
+        'subscriptions': len(subscription_pairs),
+    }
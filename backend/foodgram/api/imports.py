@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from recipes.cache_versions import bump_recipes_version
+from recipes.changes import log_recipe_changes
+from recipes.images import acquire_images, schedule_image_variants
+from recipes.models import Ingredient, IngredientToRecipe, Recipe, Tag
+from users.models import User
+from .counters import change_counter
+from .feed import fan_out_recipes
+from .search import update_search_documents
+from .serializers import RecipeImportSerializer
+
+
+def get_existing_ids(model, ids):
+    return set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+
+
+def validate_batch(items, context):
+    """
+    Проверяет пачку рецептов. Возвращает список (номер, данные) для
+    корректных рецептов и список ошибок с номерами остальных.
+    Теги и ингредиенты всей пачки проверяются двумя запросами IN.
+    """
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        serializer = RecipeImportSerializer(data=item, context=context)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+    tag_ids = get_existing_ids(Tag, {
+        tag for _, data in valid for tag in data['tags']
+    })
+    ingredient_ids = get_existing_ids(Ingredient, {
+        item['id'] for _, data in valid for item in data['ingredients']
+    })
+    checked = []
+    for index, data in valid:
+        item_errors = {}
+        if not set(data['tags']) <= tag_ids:
+            item_errors['tags'] = ['Такого тега не существует']
+        if not {item['id'] for item in data['ingredients']} <= ingredient_ids:
+            item_errors['ingredients'] = ['Такого ингредиента не сущестует']
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        else:
+            checked.append((index, data))
+    errors.sort(key=lambda error: error['index'])
+    return checked, errors
+
+
+def create_recipes(author, batch):
+    """Создает рецепты пачки вместе с тегами и ингредиентами."""
+    recipes = [
+        Recipe(
+            author=author,
+            name=data['name'],
+            text=data['text'],
+            image=data['image'],
+            cooking_time=data['cooking_time'],
+        ) for _, data in batch
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+        # bulk_create не отправляет сигналы, поэтому счетчик, ссылки
+        # на картинки и ленты подписчиков обновляются вручную.
+        change_counter(User, author.pk, 'recipes_count', len(recipes))
+        acquire_images(recipe.image.name for recipe in recipes)
+        fan_out_recipes(author, recipes)
+        transaction.on_commit(bump_recipes_version)
+        log_recipe_changes(recipe.id for recipe in recipes)
+    else:
+        for recipe in recipes:
+            recipe.save()
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+        for recipe, (_, data) in zip(recipes, batch)
+        for tag_id in data['tags']
+    ])
+    IngredientToRecipe.objects.bulk_create([
+        IngredientToRecipe(
+            recipe=recipe,
+            ingredient_id=item['id'],
+            amount=item['amount'],
+        )
+        for recipe, (_, data) in zip(recipes, batch)
+        for item in data['ingredients']
+    ])
+    update_search_documents([recipe.id for recipe in recipes])
+    for recipe in recipes:
+        schedule_image_variants(recipe.id)
+    return recipes
+
+
+def import_recipes(items, author, context=None, batch_size=None):
+    """
+    Массовый импорт рецептов от имени author.
+    Рецепты создаются пачками по batch_size, каждая пачка - в отдельной
+    транзакции. Возвращает созданные рецепты и ошибки по номерам рецептов.
+    """
+    batch_size = batch_size or settings.RECIPES_IMPORT_BATCH_SIZE
+    created, errors = [], []
+    for start in range(0, len(items), batch_size):
+        batch, batch_errors = validate_batch(
+            items[start:start + batch_size], context or {}
+        )
+        for error in batch_errors:
+            error['index'] += start
+        errors.extend(batch_errors)
+        if batch:
+            with transaction.atomic():
+                created.extend(create_recipes(author, batch))
+    return created, errors
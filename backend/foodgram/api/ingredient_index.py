@@ -0,0 +1,63 @@
+import threading
+from bisect import bisect_left
+
+from recipes.cache_versions import INGREDIENTS_VERSION_KEY, get_cache_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов для автодополнения.
+    Хранит отсортированные названия в нижнем регистре и параллельный
+    массив готовых к выдаче записей. Поиск по началу строки выполняется
+    бинарным поиском, совпадения по подстроке выдаются после них.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: (row[1].casefold(), row[0]))
+        self.keys = tuple(name.casefold() for _, name, _ in rows)
+        self.items = tuple(
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for pk, name, measurement_unit in rows
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, query):
+        query = query.casefold()
+        if not query:
+            return list(self.items)
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\U0010ffff', lo=start)
+        contains = [
+            item for key, item in zip(self.keys, self.items)
+            if query in key and not key.startswith(query)
+        ]
+        return list(self.items[start:end]) + contains
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_ingredient_index():
+    """
+    Индекс ингредиентов текущего процесса.
+    Строится при первом обращении и перестраивается после изменения
+    версии каталога ингредиентов. Версия хранится в общем кэше, а если
+    кэш у каждого процесса свой - в БД, поэтому изменение каталога
+    в одном процессе перестраивает индексы всех процессов.
+    """
+    global _index, _index_version
+    version = get_cache_version(INGREDIENTS_VERSION_KEY)
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = IngredientIndex(Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ))
+            _index_version = version
+    return _index
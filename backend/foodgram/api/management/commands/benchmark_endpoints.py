@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import get_benchmark_context, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа и число SQL-запросов эндпоинтов API '
+        'на данных generate_fixture_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнять каждый запрос.'
+        )
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Сохранить результаты в json-файл.'
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой при превышении бюджета запросов.'
+        )
+
+    def handle(self, **options):
+        try:
+            context = get_benchmark_context()
+        except ValueError as error:
+            raise CommandError(error)
+        results = run_benchmarks(context, repeat=options['repeat'])
+        over_budget = []
+        for result in results:
+            line = (
+                f'{result["name"]:32} {result["status"]:4} '
+                f'запросов {result["queries"]:3}/{result["budget"]:<3} '
+                f'медиана {result["median"] * 1000:8.2f} мс '
+                f'p95 {result["p95"] * 1000:8.2f} мс'
+            )
+            if result['queries'] > result['budget']:
+                over_budget.append(result['name'])
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if over_budget and options['strict']:
+            raise CommandError(
+                f'Превышен бюджет запросов: {", ".join(over_budget)}'
+            )
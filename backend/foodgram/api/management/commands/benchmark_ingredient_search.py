@@ -0,0 +1,63 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.filters import IngredientFilter
+from api.ingredient_index import IngredientIndex
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость поиска ингредиентов через ORM '
+        'и через индекс в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', type=int, default=500,
+            help='Количество поисковых запросов.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.'
+        )
+
+    def handle(self, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('Каталог ингредиентов пуст.')
+        randomizer = random.Random(options['seed'])
+        queries = [
+            name[:randomizer.randint(1, 4)]
+            for name in randomizer.choices(names, k=options['queries'])
+        ]
+
+        started = time.perf_counter()
+        index = IngredientIndex(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        )
+        build_time = time.perf_counter() - started
+        self.stdout.write(
+            f'Индекс: {len(index)} ингредиентов, '
+            f'построение {build_time * 1000:.1f} мс'
+        )
+        self.report('ORM', queries, lambda query: list(IngredientFilter(
+            {'name': query}, queryset=Ingredient.objects.all()
+        ).qs.values('id', 'name', 'measurement_unit')))
+        self.report('Индекс', queries, index.search)
+
+    def report(self, title, queries, search):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{title}: среднее {statistics.mean(timings):.3f} мс, '
+            f'медиана {statistics.median(timings):.3f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.3f} мс'
+        ))
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.similarity import iter_similar_recipes
+from recipes.models import SimilarRecipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих рецептов по совместному добавлению '
+        'в избранное и общим ингредиентам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=settings.SIMILAR_RECIPES_TOP_K,
+            help='Сколько похожих рецептов хранить для каждого рецепта.'
+        )
+        parser.add_argument('--favorite-weight', type=float, default=0.7)
+        parser.add_argument('--ingredient-weight', type=float, default=0.3)
+        parser.add_argument(
+            '--max-share', type=float, default=0.5,
+            help='Не учитывать ингредиенты, которые есть в большей доле '
+                 'рецептов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, **options):
+        total = 0
+        for recipe_ids, rows in iter_similar_recipes(
+            options['top'],
+            options['favorite_weight'],
+            options['ingredient_weight'],
+            options['max_share'],
+            options['batch_size'],
+        ):
+            with transaction.atomic():
+                SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+                SimilarRecipe.objects.bulk_create(
+                    SimilarRecipe(
+                        recipe_id=recipe_id, similar_id=similar_id, score=score
+                    )
+                    for recipe_id, similar_id, score in rows
+                )
+            total += len(rows)
+        self.stdout.write(
+            self.style.SUCCESS(f'Сохранено похожих рецептов: {total}')
+        )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.fixtures import generate_fixture_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетические данные для нагрузочного тестирования: '
+        'юзеров, рецепты, теги, ингредиенты, избранное, корзины и подписки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--tags', type=int, default=8)
+        parser.add_argument(
+            '--ingredients', type=int, default=300,
+            help='Сколько ингредиентов каталога использовать. Если каталог '
+                 'меньше, он дополняется.'
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число рецептов в избранном у юзера.'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее число рецептов в корзине у юзера.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=5,
+            help='Среднее число подписок у юзера.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, **options):
+        started = time.monotonic()
+        created = generate_fixture_data(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            ingredients=options['ingredients'],
+            favorites=options['favorites'],
+            carts=options['carts'],
+            subscriptions=options['subscriptions'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        for name, count in created.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,49 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import import_recipes
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует рецепты из json-файла. Формат рецепта совпадает '
+        'с форматом запроса на создание рецепта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к json-файлу со списком.')
+        parser.add_argument(
+            '--author', required=True,
+            help='Email пользователя, от имени которого создаются рецепты.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Количество рецептов в одной транзакции.'
+        )
+
+    def handle(self, **options):
+        try:
+            author = User.objects.get(email=options['author'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден.')
+        try:
+            with open(options['path'], encoding='utf-8') as json_file:
+                items = json.load(json_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        if not isinstance(items, list):
+            raise CommandError('Файл должен содержать список рецептов.')
+
+        created, errors = import_recipes(
+            items, author, batch_size=options['batch_size']
+        )
+        for error in errors:
+            self.stderr.write(f'Рецепт №{error["index"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано рецептов: {len(created)}, с ошибками: {len(errors)}'
+        ))
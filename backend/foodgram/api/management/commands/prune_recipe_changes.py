@@ -0,0 +1,25 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import RecipeChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет записи журнала изменений рецептов старше '
+        'RECIPES_SYNC_MAX_AGE дней: клиенты с более старым курсором '
+        'выполняют полную синхронизацию.'
+    )
+
+    def handle(self, **options):
+        deleted, _ = RecipeChange.objects.filter(
+            created__lt=timezone.now() - datetime.timedelta(
+                days=settings.RECIPES_SYNC_MAX_AGE
+            )
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {deleted}'
+        ))
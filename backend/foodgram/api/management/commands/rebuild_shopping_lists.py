@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает сводные списки покупок из корзин, например после '
+        'изменения корзин в обход API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'users', nargs='*', type=int,
+            help='id юзеров, по умолчанию - все.'
+        )
+
+    def handle(self, users, **options):
+        items = rebuild_shopping_lists(users or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны: {items} строк'
+        ))
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопительные корзины, сумма."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        total += self.counts[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {total}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {total}')
+        return lines
+
+
+class EndpointMetrics:
+    """Агрегаты запросов к одному маршруту одним методом."""
+
+    def __init__(self):
+        self.latency = Histogram(settings.METRICS_LATENCY_BUCKETS)
+        self.queries = Histogram(settings.METRICS_QUERIES_BUCKETS)
+        self.size = Histogram(settings.METRICS_SIZE_BUCKETS)
+        self.sql_time = 0
+        self.statuses = defaultdict(int)
+
+
+HISTOGRAMS = (
+    (
+        'latency', 'foodgram_http_request_duration_seconds',
+        'Время обработки запроса.'
+    ),
+    (
+        'queries', 'foodgram_db_queries_per_request',
+        'Число SQL-запросов на один запрос.'
+    ),
+    (
+        'size', 'foodgram_http_response_size_bytes',
+        'Размер ответа без потоковых ответов.'
+    ),
+)
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса. Хранятся в памяти процесса, поэтому каждый
+    воркер отдает только свои данные.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(EndpointMetrics)
+
+    def record(self, view, method, status, duration, queries, sql_time,
+               size):
+        with self.lock:
+            metrics = self.endpoints[view, method]
+            metrics.latency.observe(duration)
+            metrics.queries.observe(queries)
+            if size is not None:
+                metrics.size.observe(size)
+            metrics.sql_time += sql_time
+            metrics.statuses[status] += 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = []
+            for attr, name, help_text in HISTOGRAMS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method), metrics in endpoints:
+                    lines.extend(getattr(metrics, attr).render(
+                        name, f'view="{view}",method="{method}"'
+                    ))
+            name = 'foodgram_db_query_duration_seconds_total'
+            lines.append(f'# HELP {name} Суммарное время SQL-запросов.')
+            lines.append(f'# TYPE {name} counter')
+            for (view, method), metrics in endpoints:
+                lines.append(
+                    f'{name}{{view="{view}",method="{method}"}} '
+                    f'{metrics.sql_time}'
+                )
+            name = 'foodgram_http_requests_total'
+            lines.append(f'# HELP {name} Число запросов по кодам ответа.')
+            lines.append(f'# TYPE {name} counter')
+            for (view, method), metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'{name}{{view="{view}",method="{method}",'
+                        f'status="{status}"}} {count}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    """Число и время SQL-запросов одного запроса к API."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - started
+
+
+current_queries = ContextVar('current_queries', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Обертка execute_wrapper, установленная во все соединения. Учитывает
+    запрос в счетчике текущего запроса к API, в том числе когда ORM
+    вызывается из асинхронной вьюхи в другом потоке.
+    """
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    return queries(execute, sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+connection_created.connect(install_query_counter)
+for existing in connections.all():
+    install_query_counter(existing)
+
+
+class MetricsMiddleware:
+    """
+    Собирает для каждого маршрута и метода время ответа, число и время
+    SQL-запросов и размер ответа. Работает и под WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def record(self, request, response, duration, queries):
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            duration,
+            queries.count,
+            queries.time,
+            None if response.streaming else len(response.content),
+        )
@@ -1,5 +1,143 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    """
+    Постраничный вывод по ключу: следующая страница выбирается условием
+    (ключ сортировки, id) > (значения последней записи), без OFFSET
+    и без подсчета общего количества записей.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_ordering(self, queryset):
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering.append('id')
+        return [
+            (field.lstrip('-'), field.startswith('-')) for field in ordering
+        ]
+
+    def encode_cursor(self, values, reverse):
+        data = json.dumps({'v': values, 'r': reverse}, default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values, reverse = data['v'], bool(data['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def seek(self, ordering, values, reverse):
+        """Условие "строго после values" в порядке сортировки."""
+        condition = Q()
+        for position, (field, descending) in enumerate(ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for (previous, _), value in zip(ordering[:position], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        values, self.reverse = self.decode_cursor(request)
+        if values is not None:
+            if len(values) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                queryset = queryset.filter(
+                    self.seek(self.ordering, values, self.reverse)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        order_by = [
+            f'-{field}' if descending != self.reverse else field
+            for field, descending in self.ordering
+        ]
+        page = list(queryset.order_by(*order_by)[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        has_before = values is not None
+        page = page[:self.page_size]
+        if self.reverse:
+            page.reverse()
+            self.has_next, self.has_previous = has_before, has_more
+        else:
+            self.has_next, self.has_previous = has_more, has_before
+        self.page = page
+        return page
+
+    def get_cursor_link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        values = [getattr(obj, field) for field, _ in self.ordering]
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(values, reverse)
+        )
+
+    def get_next_link(self):
+        if not self.page or not self.has_next:
+            return None
+        return self.get_cursor_link(self.page[-1], False)
+
+    def get_previous_link(self):
+        if not self.page or not self.has_previous:
+            return None
+        return self.get_cursor_link(self.page[0], True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Постраничный вывод с номерами страниц. При передаче параметра cursor
+    (или pagination=cursor для первой страницы) включается вывод по ключу.
+    """
+
     page_size_query_param = "limit"
+    keyset = None
+
+    def use_keyset(self, request):
+        return (
+            KeysetPagination.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if not self.use_keyset(request):
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = KeysetPagination(self.get_page_size(request))
+        return self.keyset.paginate_queryset(queryset, request)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,214 @@
+import datetime
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, IntegerField, Max, Value, When
+from django.utils import timezone
+
+from recipes.models import IngredientToRecipe, RecipeChange
+
+# При большем числе новых записей журнала индекс дешевле построить заново.
+PANTRY_REBUILD_CHANGES = 1000
+
+
+class PantryIndex:
+    """
+    Инвертированный индекс "ингредиент -> рецепты" для подбора рецептов
+    по имеющимся продуктам. Рецепты пронумерованы строками, для каждого
+    ингредиента хранится массив строк рецептов, в которых он есть.
+    Покрытие всех рецептов набором продуктов считается одним bincount.
+    Изменения и подбор идут под блокировкой индекса: подбор не должен
+    видеть массивы разной длины посреди изменения.
+    """
+
+    def __init__(self, pairs):
+        self.lock = threading.Lock()
+        pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+        recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        self.recipe_ids = recipe_ids
+        self.rows = {
+            recipe_id: row for row, recipe_id in enumerate(recipe_ids.tolist())
+        }
+        self.sizes = np.bincount(rows, minlength=len(recipe_ids)).astype(
+            np.int32
+        )
+        order = np.argsort(pairs[:, 1], kind='stable')
+        ingredient_ids, starts = np.unique(
+            pairs[order, 1], return_index=True
+        )
+        self.postings = {
+            ingredient_id: posting.astype(np.int32)
+            for ingredient_id, posting in zip(
+                ingredient_ids.tolist(), np.split(rows[order], starts[1:])
+            )
+        } if len(pairs) else {}
+        self.members = {}
+        for row, ingredient_id in zip(rows.tolist(), pairs[:, 1].tolist()):
+            self.members.setdefault(row, set()).add(ingredient_id)
+
+    def _add_row(self, recipe_id):
+        row = len(self.recipe_ids)
+        self.recipe_ids = np.append(self.recipe_ids, recipe_id)
+        self.sizes = np.append(self.sizes, np.int32(0))
+        self.rows[recipe_id] = row
+        return row
+
+    def set_recipe(self, recipe_id, ingredient_ids):
+        """Заменяет ингредиенты одного рецепта, пустой список - удаление."""
+        with self.lock:
+            self._set_recipe(recipe_id, ingredient_ids)
+
+    def _set_recipe(self, recipe_id, ingredient_ids):
+        row = self.rows.get(recipe_id)
+        if row is None:
+            if not ingredient_ids:
+                return
+            row = self._add_row(recipe_id)
+        current = self.members.get(row, set())
+        submitted = set(ingredient_ids)
+        for ingredient_id in current - submitted:
+            posting = self.postings[ingredient_id]
+            self.postings[ingredient_id] = posting[posting != row]
+        for ingredient_id in submitted - current:
+            self.postings[ingredient_id] = np.append(
+                self.postings.get(ingredient_id, np.empty(0, np.int32)),
+                np.int32(row)
+            )
+        self.members[row] = submitted
+        self.sizes[row] = len(submitted)
+
+    def match(self, ingredient_ids, max_missing=0, limit=None):
+        """
+        Рецепты, для которых не хватает не более max_missing ингредиентов.
+        Возвращает список (id рецепта, не хватает, есть), отсортированный
+        по числу недостающих и затем по числу имеющихся ингредиентов.
+        """
+        with self.lock:
+            return self._match(ingredient_ids, max_missing, limit)
+
+    def _match(self, ingredient_ids, max_missing, limit):
+        postings = [
+            self.postings[ingredient_id] for ingredient_id in ingredient_ids
+            if ingredient_id in self.postings
+        ]
+        if not postings:
+            return []
+        covered = np.bincount(
+            np.concatenate(postings), minlength=len(self.recipe_ids)
+        )
+        missing = self.sizes - covered
+        candidates = np.flatnonzero(
+            (covered > 0) & (missing <= max_missing)
+        )
+        order = np.lexsort((
+            self.recipe_ids[candidates],
+            -covered[candidates],
+            missing[candidates],
+        ))
+        candidates = candidates[order][:limit]
+        return list(zip(
+            self.recipe_ids[candidates].tolist(),
+            missing[candidates].tolist(),
+            covered[candidates].tolist(),
+        ))
+
+
+_lock = threading.Lock()
+_index = None
+_applied = None
+_synced = None
+
+
+def build_pantry_index():
+    global _index, _applied
+    # Позиция журнала берется до чтения ингредиентов: изменения,
+    # записанные позже, будут применены при следующем обращении.
+    applied = RecipeChange.objects.aggregate(last=Max('id'))['last'] or 0
+    _index = PantryIndex(IngredientToRecipe.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ).order_by())
+    _applied = applied
+
+
+def apply_recipe_changes():
+    """
+    Применяет к индексу записи журнала изменений рецептов после
+    последней примененной: ингредиенты перечитываются только для
+    рецептов из новых записей. Записи моложе RECIPES_SYNC_LAG секунд
+    применяются повторно при следующем обращении: запись с меньшим
+    номером могла еще не зафиксироваться.
+    """
+    global _applied
+    changes = list(RecipeChange.objects.filter(
+        id__gt=_applied
+    ).order_by('id').values_list(
+        'id', 'recipe_id', 'created'
+    )[:PANTRY_REBUILD_CHANGES + 1])
+    if not changes:
+        return
+    if len(changes) > PANTRY_REBUILD_CHANGES:
+        build_pantry_index()
+        return
+    recipes = {recipe_id: [] for _, recipe_id, _ in changes}
+    for recipe_id, ingredient_id in IngredientToRecipe.objects.filter(
+        recipe_id__in=recipes
+    ).values_list('recipe_id', 'ingredient_id').order_by():
+        recipes[recipe_id].append(ingredient_id)
+    for recipe_id, ingredient_ids in recipes.items():
+        _index.set_recipe(recipe_id, ingredient_ids)
+    until = timezone.now() - datetime.timedelta(
+        seconds=settings.RECIPES_SYNC_LAG
+    )
+    for change_id, _, created in changes:
+        if created >= until:
+            break
+        _applied = change_id
+
+
+def get_pantry_index():
+    """
+    Индекс текущего процесса. Строится из IngredientToRecipe при первом
+    обращении, а затем догоняет журнал изменений рецептов. Если индекс
+    не обновлялся дольше, чем хранится журнал, он строится заново.
+    """
+    global _synced
+    now = timezone.now()
+    with _lock:
+        if _index is None or _synced < now - datetime.timedelta(
+            days=settings.RECIPES_SYNC_MAX_AGE
+        ):
+            build_pantry_index()
+        else:
+            apply_recipe_changes()
+        _synced = now
+    return _index
+
+
+def group_ids(matches, position):
+    groups = {}
+    for match in matches:
+        groups.setdefault(match[position], []).append(match[0])
+    return Case(
+        *(When(id__in=ids, then=Value(key)) for key, ids in groups.items()),
+        output_field=IntegerField()
+    )
+
+
+def filter_by_pantry(queryset, ingredient_ids, max_missing=0):
+    """
+    Рецепты, которые можно приготовить из ingredient_ids, докупив не более
+    max_missing ингредиентов. Сначала идут рецепты с меньшим числом
+    недостающих ингредиентов.
+    """
+    matches = get_pantry_index().match(
+        ingredient_ids, max_missing, limit=settings.PANTRY_MAX_RESULTS
+    )
+    if not matches:
+        return queryset.none()
+    return queryset.filter(
+        id__in=[recipe_id for recipe_id, _, _ in matches]
+    ).annotate(
+        missing_ingredients=group_ids(matches, 1),
+        matched_ingredients=group_ids(matches, 2),
+    ).order_by('missing_ingredients', '-matched_ingredients', 'id')
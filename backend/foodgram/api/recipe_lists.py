@@ -0,0 +1,111 @@
+"""
+Избранное и корзина: добавление и удаление пачкой рецептов.
+Вставка - один INSERT ... ON CONFLICT DO NOTHING RETURNING, удаление -
+один DELETE ... RETURNING. При одновременном добавлении одного рецепта
+строку вставляет только один запрос и получает 201, остальные получают
+400 "Рецепт уже добавлен!". Счетчики сдвигаются на число действительно
+вставленных или удаленных строк (shift_counters).
+RETURNING требует PostgreSQL или SQLite не старше 3.35.
+"""
+from django.db import connection, transaction
+
+from recipes.models import Recipe, ShoppingCart
+from .counters import shift_counters
+from .shopping_list import (add_to_shopping_list, lock_recipes,
+                            lock_shopping_list, remove_from_shopping_lists)
+from .sync import touch_user_flags
+
+
+def fetch_recipe_ids(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def insert_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину юзера одним запросом
+    INSERT ... ON CONFLICT DO NOTHING RETURNING: повторное и параллельное
+    добавление не приводит к ошибке, а счетчики увеличиваются только
+    для действительно вставленных строк. Возвращает найденные рецепты
+    с флагом added - был ли рецепт добавлен до запроса.
+    """
+    recipes = list(Recipe.objects.filter(id__in=recipe_ids))
+    if not recipes:
+        return recipes
+    values = ', '.join(['(%s, %s)'] * len(recipes))
+    inserted = set(fetch_recipe_ids(
+        f'INSERT INTO {model._meta.db_table} (user_id, recipe_id) '
+        f'VALUES {values} '
+        'ON CONFLICT (user_id, recipe_id) DO NOTHING RETURNING recipe_id',
+        [value for recipe in recipes for value in (user.id, recipe.id)]
+    ))
+    for recipe in recipes:
+        recipe.added = recipe.id not in inserted
+    if inserted:
+        shift_counters(model, inserted, 1)
+        touch_user_flags(user.id)
+    return recipes
+
+
+def delete_recipes(model, user, recipe_ids):
+    """
+    Удаляет рецепты из избранного или корзины юзера одним запросом
+    DELETE ... RETURNING: счетчики уменьшаются только для действительно
+    удаленных строк. Возвращает id удаленных рецептов.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    deleted = fetch_recipe_ids(
+        f'DELETE FROM {model._meta.db_table} '
+        f'WHERE user_id = %s AND recipe_id IN ({placeholders}) '
+        'RETURNING recipe_id',
+        [user.id, *recipe_ids]
+    )
+    if deleted:
+        shift_counters(model, deleted, -1)
+        touch_user_flags(user.id)
+    return deleted
+
+
+@transaction.atomic
+def add_to_shopping_cart(user, recipe_ids):
+    """
+    Добавляет рецепты в корзину и их ингредиенты в список покупок.
+    Изменения корзины одного юзера выполняются по очереди, поэтому
+    флаг added точен и рецепт не учитывается в списке дважды.
+    """
+    lock_shopping_list(user)
+    lock_recipes(recipe_ids)
+    recipes = insert_recipes(ShoppingCart, user, recipe_ids)
+    new_ids = [recipe.id for recipe in recipes if not recipe.added]
+    if new_ids:
+        add_to_shopping_list(user, new_ids)
+    return recipes
+
+
+@transaction.atomic
+def remove_from_shopping_cart(user, recipe_ids):
+    """Удаляет рецепты из корзины и их ингредиенты из списка покупок."""
+    lock_shopping_list(user)
+    lock_recipes(recipe_ids)
+    deleted = delete_recipes(ShoppingCart, user, recipe_ids)
+    if deleted:
+        remove_from_shopping_lists([user.id], deleted)
+    return len(deleted)
+
+
+def add_recipes(model, user, recipe_ids):
+    """Добавляет рецепты в избранное (Favorite) или корзину."""
+    if model is ShoppingCart:
+        return add_to_shopping_cart(user, recipe_ids)
+    return insert_recipes(model, user, recipe_ids)
+
+
+def remove_recipes(model, user, recipe_ids):
+    """Удаляет рецепты из избранного (Favorite) или корзины."""
+    if model is ShoppingCart:
+        return remove_from_shopping_cart(user, recipe_ids)
+    return len(delete_recipes(model, user, recipe_ids))
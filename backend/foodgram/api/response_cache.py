@@ -0,0 +1,58 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.cache_versions import get_cache_versions
+
+
+RESPONSE_CACHE_KEY = 'response:{}'
+
+
+def get_response_cache_key(request, versions):
+    """
+    Ключ ответа: адрес, нормализованные параметры запроса
+    и версии данных, от которых зависит ответ.
+    """
+    params = sorted(
+        (key, sorted(value for value in values if value))
+        for key, values in request.query_params.lists()
+    )
+    raw = json.dumps([
+        request.get_host(),
+        request.path,
+        [(key, values) for key, values in params if values],
+        versions,
+    ])
+    return RESPONSE_CACHE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def cache_anonymous_response(get_version_keys):
+    """
+    Кэширует данные успешных ответов анонимным юзерам.
+    get_version_keys получает kwargs запроса и возвращает ключи версий,
+    смена любой из которых делает закэшированный ответ недоступным.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+            key = get_response_cache_key(
+                request, get_cache_versions(get_version_keys(kwargs))
+            )
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(
+                    key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+                )
+            return response
+        return wrapper
+    return decorator
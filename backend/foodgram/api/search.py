@@ -0,0 +1,79 @@
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Func, Value
+
+from recipes.models import IngredientToRecipe, Recipe
+
+
+# Должна совпадать с конфигурацией в GIN-индексе recipe_search_idx.
+SEARCH_CONFIG = 'russian'
+
+
+class SearchFunc(Func):
+    """
+    Выражение полнотекстового поиска Postgres по search_document.
+    Выражение to_tsvector совпадает с выражением GIN-индекса.
+    """
+
+    def __init__(self, query, **extra):
+        super().__init__('search_document', Value(query), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        document, document_params = compiler.compile(
+            self.source_expressions[0]
+        )
+        query, query_params = compiler.compile(self.source_expressions[1])
+        return self.template.format(
+            vector=f"to_tsvector('{SEARCH_CONFIG}', {document})",
+            query=f"websearch_to_tsquery('{SEARCH_CONFIG}', {query})",
+        ), (*document_params, *query_params)
+
+
+class SearchMatch(SearchFunc):
+    template = '{vector} @@ {query}'
+    conditional = True
+    output_field = BooleanField()
+
+
+class SearchRank(SearchFunc):
+    template = 'ts_rank({vector}, {query})'
+    output_field = FloatField()
+
+
+def search_recipes(queryset, query):
+    """
+    Поиск рецептов по названию, описанию и ингредиентам.
+    В Postgres используется индексированный полнотекстовый поиск
+    с ранжированием, в остальных БД - поиск всех слов запроса.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.filter(SearchMatch(query)).annotate(
+            search_rank=SearchRank(query)
+        ).order_by('-search_rank', 'id')
+    for word in query.lower().split():
+        queryset = queryset.filter(search_document__contains=word)
+    return queryset
+
+
+def build_search_document(name, text, ingredients):
+    return ' '.join((name, text, *ingredients)).lower()
+
+
+def update_search_documents(recipe_ids):
+    """Пересобирает поисковые документы рецептов тремя запросами."""
+    ingredients = {}
+    for recipe_id, name in IngredientToRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('ingredient__name').values_list(
+        'recipe_id', 'ingredient__name'
+    ):
+        ingredients.setdefault(recipe_id, []).append(name)
+    recipes = list(Recipe.objects.filter(id__in=recipe_ids).only(
+        'id', 'name', 'text', 'search_document'
+    ))
+    for recipe in recipes:
+        recipe.search_document = build_search_document(
+            recipe.name, recipe.text, ingredients.get(recipe.id, ())
+        )
+    Recipe.objects.bulk_update(
+        recipes, ('search_document',), batch_size=500
+    )
@@ -1,19 +1,26 @@
 from django.conf import settings
 from django.db import transaction
-from django.db.models import F
 from rest_framework import serializers, status
 from rest_framework.validators import ValidationError
 
-from recipes.models import Ingredient, IngredientToRecipe, Recipe, Tag
+from recipes.images import schedule_image_variants
+from recipes.models import (Ingredient, IngredientToRecipe, Recipe,
+                            ShoppingListItem, Tag)
 from users.serializers import CustomUserReadSerializer
+from .search import update_search_documents
 from .services import (Base64ImageField, BaseRecipeSerializer, Hex2NameColor,
+                       ImageVariantsField, get_recipes_queryset,
                        get_validated_tags_and_ingredients_if_exists)
+from .shopping_list import change_shopping_lists, lock_recipes
+from .validators import (get_validate_tags, validate_ingredients_unique,
+                         validate_tags_and_ingredients_exists)
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Вспомогательный сериалайзер для доступа к усеченному списку полей."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -21,6 +28,7 @@ class RecipeShortSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
 
@@ -30,7 +38,7 @@ class SubscribeSerializer(CustomUserReadSerializer):
     Сериалайзер для подписок.
     Дополнительно проверяет повторные подписки и подписки на самого себя.
     """
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
     recipes = serializers.SerializerMethodField()
 
     class Meta(CustomUserReadSerializer.Meta):
@@ -55,14 +63,11 @@ class SubscribeSerializer(CustomUserReadSerializer):
             )
         return data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         recipes = obj.recipes.all()
-        if limit:
+        if limit and limit.isdigit():
             recipes = recipes[:int(limit)]
         serializer = RecipeShortSerializer(
             recipes, many=True, read_only=True
@@ -89,6 +94,20 @@ class IngredientToRecipeWriteSerializer(serializers.Serializer):
     )
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериалайзер для строк сводного списка покупок."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериалайзер для получения тегов."""
 
@@ -111,31 +130,37 @@ class RecipeSerializer(BaseRecipeSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'author', 'name', 'text',
-            'image', 'cooking_time', 'tags',
+            'image', 'image_variants', 'cooking_time', 'tags',
             'ingredients', 'is_favorited', 'is_in_shopping_cart'
         )
 
     def get_ingredients(self, obj):
-        ingredients = obj.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('ingredienttorecipe__amount')
-        )
-        return ingredients
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            } for item in obj.ingredienttorecipe_set.all()
+        ]
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -163,6 +188,11 @@ class RecipeCreateSerializer(BaseRecipeSerializer):
             'cooking_time', 'tags', 'ingredients'
         )
 
+    def validate(self, data):
+        if self.instance is None:
+            validate_tags_and_ingredients_exists(self, data)
+        return data
+
     @transaction.atomic
     def create_ingredients_amounts(self, ingredients, recipe):
         IngredientToRecipe.objects.bulk_create([
@@ -181,24 +211,127 @@ class RecipeCreateSerializer(BaseRecipeSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients_amounts(recipe=recipe, ingredients=ingredients)
+        update_search_documents([recipe.id])
+        schedule_image_variants(recipe.id)
         return recipe
 
+    def update_tags(self, recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        submitted = {tag.id for tag in tags}
+        if current - submitted:
+            recipe.tags.remove(*(current - submitted))
+        if submitted - current:
+            recipe.tags.add(*(submitted - current))
+
+    def update_ingredients_amounts(self, recipe, ingredients):
+        """
+        Приводит ингредиенты рецепта к переданному списку, изменяя только
+        отличающиеся строки. Возвращает изменения количеств
+        {ингредиент: разница}, пустые, если ничего не изменилось.
+        """
+        current = {
+            item.ingredient_id: item
+            for item in IngredientToRecipe.objects.filter(recipe=recipe)
+        }
+        submitted = {item['id']: item['amount'] for item in ingredients}
+        removed = current.keys() - submitted.keys()
+        if removed:
+            IngredientToRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        deltas = {
+            ingredient_id: -current[ingredient_id].amount
+            for ingredient_id in removed
+        }
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = submitted.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                deltas[ingredient_id] = amount - item.amount
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            IngredientToRecipe.objects.bulk_update(changed, ('amount',))
+        added = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in submitted.items()
+            if ingredient_id not in current
+        ]
+        if added:
+            self.create_ingredients_amounts(
+                recipe=recipe, ingredients=added
+            )
+        deltas.update((item['id'], item['amount']) for item in added)
+        return deltas
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags, ingredients = get_validated_tags_and_ingredients_if_exists(
-            self, validated_data
-        )
+        """
+        Частичное обновление рецепта: теги и ингредиенты меняются только
+        если переданы, и только отличающиеся от текущих.
+        """
+        lock_recipes([instance.pk])
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if 'image' in validated_data:
+            validated_data['image_variants'] = {}
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_amounts(
-            recipe=instance, ingredients=ingredients
-        )
-        instance.save()
+        if tags is not None:
+            self.update_tags(instance, tags)
+        deltas = {}
+        if ingredients is not None:
+            deltas = self.update_ingredients_amounts(instance, ingredients)
+        if deltas:
+            change_shopping_lists(
+                instance.shopping_recipe.values_list('user_id', flat=True),
+                deltas
+            )
+        if deltas or validated_data.keys() & {
+            'name', 'text'
+        }:
+            update_search_documents([instance.id])
+        if 'image' in validated_data:
+            schedule_image_variants(instance.id)
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = get_recipes_queryset(request.user).get(pk=instance.pk)
         return RecipeSerializer(instance, context=context).data
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """
+    Сериалайзер для проверки рецепта при массовом импорте.
+    Существование тегов и ингредиентов проверяется сразу для всей пачки.
+    """
+
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = IngredientToRecipeWriteSerializer(many=True)
+    image = Base64ImageField()
+    cooking_time = serializers.IntegerField(
+        min_value=settings.MIN_COOCK_TIME, max_value=settings.MAX_COOCK_TIME
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'name', 'text', 'image', 'cooking_time', 'tags', 'ingredients'
+        )
+
+    def validate_ingredients(self, value):
+        return validate_ingredients_unique(value)
+
+    def validate_tags(self, value):
+        return get_validate_tags(self, value)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список рецептов для массовых операций с избранным и корзиной."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPES_BATCH_MAX_ITEMS
+    )
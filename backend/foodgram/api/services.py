@@ -1,17 +1,32 @@
 import base64
+import csv
 import datetime
+import hashlib
 
 import webcolors
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import serializers, status
+from rest_framework.response import Response
 
-from recipes.models import Ingredient, IngredientToRecipe
+from recipes.cache_versions import get_shopping_cart_version
+from recipes.models import (Favorite, Ingredient, IngredientToRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem)
+from recipes.storage import image_storage
+from users.models import Subscribe, User
 from .validators import (get_validate_ingredients, get_validate_tags,
                          validate_tags_and_ingredients_exists)
 
 
+SHOPPING_CART_LIST_KEY = 'shopping_cart_list:{}:{}'
+
+
 class Base64ImageField(serializers.ImageField):
     """
     Сериалайзер для сохранения изображений на сервер.
@@ -23,8 +38,39 @@ class Base64ImageField(serializers.ImageField):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+        elif isinstance(data, str) and self.is_current_image(data):
+            raise serializers.SkipField()
         return super().to_internal_value(data)
 
+    def is_current_image(self, url):
+        """При обновлении ссылка на текущую картинку означает "не менять"."""
+        instance = getattr(self.parent, 'instance', None)
+        current = getattr(instance, self.source, None)
+        return bool(current) and url.endswith(current.url)
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Вспомогательный сериалайзер отдает ссылки на уменьшенные копии
+    картинки в виде {размер: {формат: url}}.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for size, formats in value.items():
+            variants[size] = {}
+            for ext, name in formats.items():
+                url = image_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][ext] = url
+        return variants
+
 
 class Hex2NameColor(serializers.Field):
     """Вспомогательный сериалайзер преобразует HEX-код цвета в его название."""
@@ -48,35 +94,175 @@ class BaseRecipeSerializer(serializers.ModelSerializer):
         return get_validate_tags(self, value)
 
 
-def get_shopping_file(self, request):
-    user = request.user
+def annotate_is_subscribed(queryset, user):
+    """Добавляет к выборке пользователей флаг подписки текущего юзера."""
+    if user.is_anonymous:
+        return queryset.annotate(is_subscribed=Value(False))
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+        )
+    )
 
-    ingredients = IngredientToRecipe.objects.filter(
-        recipe__shopping_recipe__user=request.user
-    ).values(
-        'ingredient__name',
-        'ingredient__measurement_unit'
-    ).annotate(amount=Sum('amount'))
 
-    today = datetime.datetime.today()
-    shopping_list = (
+def get_recipes_queryset(user):
+    """
+    Выборка рецептов со всеми связанными данными и флагами текущего юзера.
+    Количество запросов не зависит от количества рецептов на странице.
+    """
+    queryset = Recipe.objects.prefetch_related(
+        Prefetch(
+            'author',
+            queryset=annotate_is_subscribed(User.objects.all(), user)
+        ),
+        'tags',
+        Prefetch(
+            'ingredienttorecipe_set',
+            queryset=IngredientToRecipe.objects.select_related(
+                'ingredient'
+            ).order_by('ingredient__name')
+        ),
+    )
+    if user.is_anonymous:
+        return queryset.annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def get_limited_recipes_queryset(user, limit):
+    """
+    Рецепты авторов, на которых подписан юзер, не более limit на автора.
+    Первые limit рецептов каждого автора отбираются одним запросом
+    с оконной функцией ROW_NUMBER().
+    """
+    queryset = Recipe.objects.all()
+    if not limit:
+        return queryset
+    ranked = Recipe.objects.filter(author__owner__user=user).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('name').asc(), F('id').asc()],
+        )
+    ).values('id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        'WHERE ranked.row_number <= %s',
+        (*params, limit)
+    ))
+
+
+def get_subscriptions_queryset(user, recipes_limit=None):
+    """
+    Выборка авторов для подписок с первыми recipes_limit рецептами
+    каждого автора.
+    """
+    return annotate_is_subscribed(User.objects.all(), user).prefetch_related(
+        Prefetch(
+            'recipes',
+            queryset=get_limited_recipes_queryset(user, recipes_limit)
+        )
+    )
+
+
+def get_shopping_cart_ingredients(user):
+    """
+    Суммарный список ингредиентов из корзины юзера по сводному списку
+    покупок. Результат кэшируется по версии корзины.
+    """
+    key = SHOPPING_CART_LIST_KEY.format(
+        user.id, get_shopping_cart_version(user.id)
+    )
+    ingredients = cache.get(key)
+    if ingredients is None:
+        ingredients = list(ShoppingListItem.objects.filter(
+            user=user
+        ).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        ).order_by('ingredient__name', 'ingredient__measurement_unit'))
+        cache.set(
+            key, ingredients, timeout=settings.SHOPPING_CART_CACHE_TIMEOUT
+        )
+    return ingredients
+
+
+class Echo:
+    """Псевдо-буфер для построчной записи csv в генератор."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(user, ingredients, today):
+    yield (
         f'Список покупок для: {user.get_full_name()}\n\n'
         f'Дата: {today:%Y-%m-%d}\n\n'
     )
-    shopping_list += '\n'.join([
-        f'- {ingredient["ingredient__name"]} '
-        f'({ingredient["ingredient__measurement_unit"]})'
-        f' - {ingredient["amount"]}'
-        for ingredient in ingredients
-    ])
-    shopping_list += f'\n\nFoodgram ({today:%Y})'
-    filename = f'{user.username}_shopping_list.txt'
-    response = HttpResponse(
-        shopping_list,
-        content_type='text/plain',
+    for num, (name, measurement_unit, amount) in enumerate(ingredients):
+        separator = '\n' if num else ''
+        yield f'{separator}- {name} ({measurement_unit}) - {amount}'
+    yield f'\n\nFoodgram ({today:%Y})'
+
+
+def shopping_list_csv(user, ingredients, today):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for ingredient in ingredients:
+        yield writer.writerow(ingredient)
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (shopping_list_txt, 'text/plain; charset=utf-8'),
+    'csv': (shopping_list_csv, 'text/csv; charset=utf-8'),
+}
+
+
+def get_shopping_file(self, request):
+    """
+    Отдает список покупок потоком в формате txt или csv (?type=csv).
+    Поддерживает If-None-Match: повторная загрузка неизмененной корзины
+    не требует обращений к БД.
+    """
+    user = request.user
+    file_type = request.query_params.get('type', 'txt')
+    if file_type not in SHOPPING_LIST_FORMATS:
+        return Response(
+            {'errors': 'Неподдерживаемый формат файла.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    render, content_type = SHOPPING_LIST_FORMATS[file_type]
+    today = datetime.datetime.today()
+    etag = quote_etag(hashlib.md5(
+        f'{get_shopping_cart_version(user.id)}:{file_type}:'
+        f'{today:%Y-%m-%d}:{user.get_full_name()}'.encode()
+    ).hexdigest())
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and etag in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    response = StreamingHttpResponse(
+        render(user, get_shopping_cart_ingredients(user), today),
+        content_type=content_type,
         status=status.HTTP_200_OK
     )
+    filename = f'{user.username}_shopping_list.{file_type}'
     response['Content-Disposition'] = f'attachment; filename={filename}'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
     return response
 
 
@@ -0,0 +1,132 @@
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.cache_versions import bump_shopping_cart_version
+from recipes.models import IngredientToRecipe, Recipe, ShoppingListItem
+from users.models import User
+
+
+def get_recipes_amounts(recipe_ids):
+    """Суммарное количество каждого ингредиента в рецептах."""
+    return dict(IngredientToRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id').annotate(
+        total=Sum('amount')
+    ).order_by())
+
+
+def lock_rows(queryset):
+    """Блокирует строки queryset до конца транзакции."""
+    if connection.features.has_select_for_update:
+        # FOR NO KEY UPDATE не мешает вставке строк, ссылающихся
+        # на заблокированные, например избранного.
+        list(queryset.select_for_update(no_key=True).order_by(
+            'pk'
+        ).values_list('pk'))
+    else:
+        # В SQLite нет SELECT ... FOR UPDATE. Пустое изменение сразу
+        # берет блокировку записи: транзакция, начатая с чтения, не
+        # смогла бы начать запись при параллельной записи.
+        queryset.update(id=F('id'))
+
+
+def lock_shopping_list(user):
+    """
+    Блокирует до конца транзакции изменения корзины юзера в других
+    запросах, чтобы рецепт не учитывался в списке покупок дважды.
+    """
+    lock_rows(User.objects.filter(pk=user.pk))
+
+
+def lock_recipes(recipe_ids):
+    """
+    Блокирует рецепты до конца транзакции. Изменение ингредиентов рецепта
+    и изменение корзин с ним выполняются по очереди: иначе список покупок
+    юзера, добавившего рецепт во время правки, остался бы со старыми
+    количествами.
+    """
+    lock_rows(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+def change_shopping_lists(user_ids, deltas):
+    """
+    Изменяет списки покупок юзеров на {ингредиент: разница}.
+    Строки с нулевым количеством удаляются, а закэшированные списки
+    покупок юзеров сбрасываются после коммита.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    user_ids = list(user_ids)
+    if not user_ids or not deltas:
+        return
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                         amount=0)
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items() if delta > 0
+    ], ignore_conflicts=True)
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    items.update(amount=Greatest(F('amount') + Case(
+        *(When(ingredient_id=ingredient_id, then=Value(delta))
+          for ingredient_id, delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField()
+    ), 0))
+    if min(deltas.values()) < 0:
+        items.filter(amount=0).delete()
+    transaction.on_commit(lambda: bump_shopping_cart_version(*user_ids))
+
+
+def add_to_shopping_list(user, recipe_ids):
+    change_shopping_lists([user.id], get_recipes_amounts(recipe_ids))
+
+
+def remove_from_shopping_lists(user_ids, recipe_ids):
+    change_shopping_lists(user_ids, {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipes_amounts(recipe_ids).items()
+    })
+
+
+def rebuild_shopping_lists(user_ids=None):
+    """
+    Пересобирает списки покупок из корзин, например после изменения
+    корзин в обход API. Возвращает число строк в пересобранных списках.
+    """
+    items = ShoppingListItem.objects.all()
+    carts = {'recipe__shopping_recipe__isnull': False}
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        carts = {'recipe__shopping_recipe__user__in': user_ids}
+    stale_ids = set(items.values_list('user_id', flat=True).distinct())
+    items.delete()
+    amounts = IngredientToRecipe.objects.filter(**carts)
+    rebuilt = ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(
+            user_id=item['recipe__shopping_recipe__user'],
+            ingredient_id=item['ingredient'],
+            amount=item['total'],
+        ) for item in amounts.values(
+            'recipe__shopping_recipe__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by().iterator()
+    ], batch_size=1000)
+    user_ids = stale_ids | {item.user_id for item in rebuilt}
+    transaction.on_commit(lambda: bump_shopping_cart_version(*user_ids))
+    return len(rebuilt)
+
+
+def reset_ingredient_shopping_lists(ingredient):
+    """
+    Сбрасывает закэшированные списки покупок, в которых есть ингредиент,
+    например после его переименования.
+    """
+    user_ids = list(ShoppingListItem.objects.filter(
+        ingredient=ingredient
+    ).values_list('user_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: bump_shopping_cart_version(*user_ids))
@@ -0,0 +1,194 @@
+from django.contrib.auth import get_user_model, user_logged_out
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.cache_versions import (INGREDIENTS_VERSION_KEY, TAGS_VERSION_KEY,
+                                    bump_cache_version, bump_recipes_version)
+from recipes.images import acquire_images, release_image
+from recipes.changes import log_recipe_changes
+from recipes.models import (Favorite, Ingredient, IngredientToRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.signals import recipe_ingredients_changed
+from users.models import Subscribe
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .counters import change_counters
+from .feed import backfill_feed, fan_out_recipes, prune_feed
+from .search import update_search_documents
+from .shopping_list import (change_shopping_lists, lock_recipes,
+                            remove_from_shopping_lists,
+                            reset_ingredient_shopping_lists)
+from .sync import touch_recipes, touch_user_flags
+
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    transaction.on_commit(
+        lambda: bump_cache_version(INGREDIENTS_VERSION_KEY)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        recipe_ids = list(IngredientToRecipe.objects.filter(
+            ingredient=instance
+        ).values_list('recipe_id', flat=True))
+        update_search_documents(recipe_ids)
+        touch_recipes(recipe_ids)
+        reset_ingredient_shopping_lists(instance)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    # Строки списков покупок удалятся каскадом.
+    reset_ingredient_shopping_lists(instance)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_cache_version(TAGS_VERSION_KEY))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(
+            tags=instance
+        ).values_list('id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_recipes_version(instance.id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    log_recipe_changes([instance.id])
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    touch_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # После удаления у экземпляра нет ключа: он же первичный ключ.
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_tokens(key))
+
+
+@receiver(user_logged_out)
+def logged_out(sender, user, **kwargs):
+    if user is not None:
+        transaction.on_commit(lambda: invalidate_user_tokens(user.pk))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    # Деактивация, смена пароля и профиля: закэшированный юзер устарел.
+    if not created and update_fields != frozenset(('last_login',)):
+        transaction.on_commit(lambda: invalidate_user_tokens(instance.pk))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscribe)
+@receiver(post_save, sender=Recipe)
+def counted_object_saved(sender, instance, created, **kwargs):
+    if created:
+        change_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscribe)
+@receiver(post_delete, sender=Recipe)
+def counted_object_deleted(sender, instance, **kwargs):
+    change_counters(sender, instance, -1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Строки корзин удалятся каскадом, а ингредиенты рецепта нужны,
+    # чтобы вычесть их из списков покупок.
+    lock_recipes([instance.id])
+    user_ids = list(instance.shopping_recipe.values_list(
+        'user_id', flat=True
+    ))
+    if user_ids:
+        remove_from_shopping_lists(user_ids, [instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    log_recipe_changes([instance.id], deleted=True)
+
+
+@receiver(post_init, sender=Recipe)
+def recipe_loaded(sender, instance, **kwargs):
+    # Картинка на момент загрузки, чтобы при замене освободить старый
+    # файл. Отложенное поле не отслеживается: без загрузки его не заменить.
+    if 'image' in instance.__dict__:
+        instance._stored_image = (
+            instance.__dict__['image'],
+            instance.__dict__.get('image_variants'),
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, created, **kwargs):
+    if 'image' not in instance.__dict__:
+        return
+    name = instance.image.name
+    stored = getattr(instance, '_stored_image', None)
+    if created:
+        acquire_images([name])
+    elif stored is not None and stored[0] != name:
+        acquire_images([name])
+        release_image(*stored)
+    instance._stored_image = (name, instance.image_variants)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    if 'image' in instance.__dict__:
+        release_image(instance.image.name, instance.image_variants)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipes(instance.author, [instance])
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user, instance.author)
+        touch_user_flags(instance.user_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def unsubscribed(sender, instance, **kwargs):
+    prune_feed(instance.user_id, instance.author_id)
+    touch_user_flags(instance.user_id)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def recipe_ingredients_edited(sender, recipe, deltas, **kwargs):
+    lock_recipes([recipe.id])
+    change_shopping_lists(
+        recipe.shopping_recipe.values_list('user_id', flat=True), deltas
+    )
+    update_search_documents([recipe.id])
@@ -0,0 +1,93 @@
+import numpy as np
+from scipy import sparse
+
+from recipes.models import Favorite, IngredientToRecipe, Recipe
+
+
+def to_matrix(pairs, rows):
+    """Бинарная разреженная матрица из пар (строка, столбец)."""
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    column_ids, column_index = np.unique(pairs[:, 1], return_inverse=True)
+    row_index = np.searchsorted(rows, pairs[:, 0])
+    known = (row_index < len(rows)) & (
+        rows[np.minimum(row_index, len(rows) - 1)] == pairs[:, 0]
+    )
+    return sparse.csr_matrix(
+        (
+            np.ones(known.sum(), dtype=np.float32),
+            (row_index[known], column_index[known]),
+        ),
+        shape=(len(rows), len(column_ids)),
+    )
+
+
+def normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def favorites_matrix(recipe_ids):
+    """Рецепты x пользователи, строки нормированы для косинусной меры."""
+    pairs = list(Favorite.objects.values_list('recipe_id', 'user_id'))
+    return normalize_rows(to_matrix(pairs, recipe_ids))
+
+
+def ingredients_matrix(recipe_ids, max_share):
+    """
+    Рецепты x ингредиенты с весами idf. Ингредиенты, которые есть больше
+    чем в max_share рецептов (соль, вода), не учитываются.
+    """
+    pairs = list(IngredientToRecipe.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ).order_by())
+    matrix = to_matrix(pairs, recipe_ids).tocsc()
+    frequency = np.diff(matrix.indptr)
+    weights = np.log(len(recipe_ids) / np.maximum(frequency, 1))
+    weights[frequency > max_share * len(recipe_ids)] = 0
+    return normalize_rows((matrix @ sparse.diags(weights)).tocsr())
+
+
+def top_k(block, offset, k):
+    """
+    Для каждой строки блока матрицы сходства - k столбцов с наибольшими
+    значениями, без диагонали. Возвращает массивы (строка, столбец, вес).
+    """
+    block = block.tocoo()
+    rows = block.row + offset
+    keep = (rows != block.col) & (block.data > 0)
+    rows, columns, scores = rows[keep], block.col[keep], block.data[keep]
+    order = np.lexsort((-scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    starts = np.searchsorted(rows, rows, side='left')
+    keep = np.arange(len(rows)) - starts < k
+    return rows[keep], columns[keep], scores[keep]
+
+
+def iter_similar_recipes(k, favorite_weight, ingredient_weight, max_share,
+                         batch_size):
+    """
+    Считает похожие рецепты пачками по batch_size рецептов.
+    Сходство - взвешенная сумма косинусных мер по совместному добавлению
+    в избранное и по ингредиентам. Возвращает пары
+    (id рецептов пачки, список (рецепт, похожий рецепт, сходство)).
+    """
+    recipe_ids = np.array(
+        sorted(Recipe.objects.values_list('id', flat=True)), dtype=np.int64
+    )
+    if not len(recipe_ids):
+        return
+    favorites = favorites_matrix(recipe_ids)
+    ingredients = ingredients_matrix(recipe_ids, max_share)
+    for start in range(0, len(recipe_ids), batch_size):
+        end = min(start + batch_size, len(recipe_ids))
+        block = (
+            favorite_weight * (favorites[start:end] @ favorites.T)
+            + ingredient_weight * (ingredients[start:end] @ ingredients.T)
+        )
+        rows, columns, scores = top_k(block, start, k)
+        yield recipe_ids[start:end].tolist(), list(zip(
+            recipe_ids[rows].tolist(),
+            recipe_ids[columns].tolist(),
+            scores.astype(float).tolist(),
+        ))
@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from recipes.cache_versions import get_cache_version
+
+
+CATALOG_SNAPSHOT_KEY = 'catalog_snapshot:{}:{}'
+
+
+def get_catalog_snapshot(name, version_key, get_data):
+    """
+    Готовый к отдаче снимок справочника для текущей версии данных:
+    json, его gzip-вариант и ETag. Строится один раз на версию в каждом
+    кэше; версия общая для всех процессов (см. cache_versions).
+    """
+    key = CATALOG_SNAPSHOT_KEY.format(name, get_cache_version(version_key))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        content = JSONRenderer().render(get_data())
+        snapshot = {
+            'content': content,
+            'gzip': gzip.compress(content, mtime=0),
+            'etag': hashlib.sha1(content).hexdigest(),
+        }
+        cache.set(key, snapshot, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return snapshot
+
+
+def snapshot_response(request, snapshot):
+    """
+    Ответ со снимком справочника. Поддерживает If-None-Match и отдает
+    сжатый вариант клиентам, принимающим gzip.
+    """
+    use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    etag = snapshot['etag'] + ('-gzip' if use_gzip else '')
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if {snapshot['etag'], snapshot['etag'] + '-gzip'} & {
+        tag.strip('"') for tag in if_none_match
+    }:
+        response = HttpResponseNotModified()
+    elif use_gzip:
+        response = HttpResponse(
+            snapshot['gzip'], content_type='application/json'
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(
+            snapshot['content'], content_type='application/json'
+        )
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = (
+        f'public, max-age={settings.CATALOG_CACHE_MAX_AGE}'
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
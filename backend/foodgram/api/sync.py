@@ -0,0 +1,225 @@
+import base64
+import datetime
+import hashlib
+import json
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import (http_date, parse_etags, parse_http_date_safe,
+                               quote_etag)
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from recipes.cache_versions import (RECIPE_VERSION_KEY, bump_cache_version,
+                                    bump_recipes_version, get_cache_versions)
+from recipes.changes import log_recipe_changes
+from recipes.models import Recipe, RecipeChange
+
+
+RECIPE_UPDATED_KEY = 'recipe_updated:{}:{}'
+USER_FLAGS_VERSION_KEY = 'user_flags_version:{}'
+INVALID_CURSOR_MESSAGE = 'Неверный курсор.'
+
+
+def touch_recipes(recipe_ids):
+    """
+    Отмечает рецепты измененными, когда меняются данные, которые
+    входят в рецепт, но хранятся отдельно: автор, теги, ингредиенты.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    Recipe.objects.filter(id__in=recipe_ids).update(updated=timezone.now())
+    transaction.on_commit(lambda: bump_recipes_version(*recipe_ids))
+    log_recipe_changes(recipe_ids)
+
+
+def touch_user_flags(*user_ids):
+    """
+    Отмечает изменение избранного, корзины или подписок юзеров:
+    флаги is_favorited, is_in_shopping_cart и is_subscribed в рецептах.
+    Версия меняется после коммита, иначе ответ, собранный до коммита,
+    получил бы новую версию со старыми флагами.
+    """
+    transaction.on_commit(lambda: bump_cache_version(*(
+        USER_FLAGS_VERSION_KEY.format(user_id) for user_id in user_ids
+    )))
+
+
+def get_recipe_validators(request, kwargs):
+    """
+    ETag и Last-Modified рецепта в ответе юзеру или None, если рецепта
+    нет. ETag строится из точного времени изменения рецепта и версии
+    флагов юзера. Last-Modified отдается только анонимам: время изменения
+    флагов неизвестно. Время изменения кэшируется по версии рецепта.
+    """
+    pk = str(kwargs['pk'])
+    if not pk.isdigit():
+        return None
+    version_keys = [RECIPE_VERSION_KEY.format(pk)]
+    if request.user.is_authenticated:
+        version_keys.append(USER_FLAGS_VERSION_KEY.format(request.user.id))
+    versions = get_cache_versions(version_keys)
+    key = RECIPE_UPDATED_KEY.format(pk, versions[0])
+    updated = cache.get(key)
+    if updated is None:
+        updated = Recipe.objects.filter(pk=pk).values_list(
+            'updated', flat=True
+        ).first()
+        if updated is None:
+            return None
+        cache.set(key, updated, settings.RESPONSE_CACHE_TIMEOUT)
+    etag = hashlib.md5(
+        ':'.join([updated.isoformat(), *versions[1:]]).encode()
+    ).hexdigest()
+    if request.user.is_authenticated:
+        return etag, None
+    return etag, updated
+
+
+def get_last_modified_timestamp(updated):
+    """
+    Last-Modified с точностью до секунды: время округляется вверх
+    и отдается, только когда эта секунда уже прошла. Иначе изменение
+    в ту же секунду получило бы то же значение и ответ 304.
+    """
+    timestamp = math.ceil(updated.timestamp())
+    if timestamp > time.time():
+        return None
+    return timestamp
+
+
+def conditional_response(get_validators):
+    """
+    Добавляет к ответу ETag и Last-Modified и отвечает 304 на
+    If-None-Match или If-Modified-Since, не выполняя метод. Валидаторы
+    берутся до выполнения метода: изменения во время запроса сделают
+    ответ устаревшим, а не наоборот.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            validators = get_validators(request, kwargs)
+            if validators is None:
+                return method(self, request, *args, **kwargs)
+            etag, updated = validators
+            timestamp = None
+            if updated is not None:
+                timestamp = get_last_modified_timestamp(updated)
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            since = parse_http_date_safe(
+                request.META.get('HTTP_IF_MODIFIED_SINCE')
+            )
+            if if_none_match is not None:
+                not_modified = etag in {
+                    tag.strip('"') for tag in parse_etags(if_none_match)
+                }
+            else:
+                not_modified = (
+                    timestamp is not None and since is not None
+                    and timestamp <= since
+                )
+            if not_modified:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (
+                status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+            ):
+                response['ETag'] = quote_etag(etag)
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+                patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapper
+    return decorator
+
+
+def encode_sync_cursor(moment, change_id, recipe_id=None):
+    data = json.dumps([moment.isoformat(), change_id, recipe_id])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_sync_cursor(cursor):
+    try:
+        moment, change_id, recipe_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        moment = parse_datetime(moment)
+    except (TypeError, ValueError):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    if moment is None or not isinstance(change_id, int) or not (
+        recipe_id is None or isinstance(recipe_id, int)
+    ):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    return moment, change_id, recipe_id
+
+
+def is_cursor_expired(cursor):
+    """Журнал изменений старше RECIPES_SYNC_MAX_AGE дней не хранится."""
+    return cursor[0] < timezone.now() - datetime.timedelta(
+        days=settings.RECIPES_SYNC_MAX_AGE
+    )
+
+
+def get_recipe_changes(cursor, limit):
+    """
+    Изменения рецептов после курсора (время, номер записи журнала,
+    id рецепта). Без курсора сначала отдаются все рецепты по возрастанию
+    id, а затем записи журнала, сделанные после начала синхронизации.
+    Записи последних RECIPES_SYNC_LAG секунд не отдаются: запись
+    с меньшим номером могла еще не зафиксироваться. Возвращает id
+    измененных и удаленных рецептов, новый курсор и признак, что
+    изменения еще есть.
+    """
+    if cursor is None:
+        cursor = (timezone.now(), RecipeChange.objects.aggregate(
+            last=Max('id')
+        )['last'] or 0, 0)
+    moment, change_id, recipe_id = cursor
+    if recipe_id is not None:
+        recipe_ids = list(Recipe.objects.filter(id__gt=recipe_id).order_by(
+            'id'
+        ).values_list('id', flat=True)[:limit + 1])
+        has_more = len(recipe_ids) > limit
+        recipe_ids = recipe_ids[:limit]
+        return recipe_ids, [], (
+            moment, change_id, recipe_ids[-1] if has_more else None
+        ), has_more
+    until = timezone.now() - datetime.timedelta(
+        seconds=settings.RECIPES_SYNC_LAG
+    )
+    changes = list(RecipeChange.objects.filter(
+        id__gt=change_id, created__lt=until
+    ).order_by('id').values_list(
+        'id', 'recipe_id', 'deleted', 'created'
+    )[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        change_id, _, _, moment = changes[-1]
+    else:
+        # Все записи до until получены.
+        moment = max(moment, until)
+        if changes:
+            change_id = changes[-1][0]
+    # Важна только последняя запись о каждом рецепте.
+    deleted = {}
+    for _, recipe_id, is_deleted, _ in changes:
+        deleted.pop(recipe_id, None)
+        deleted[recipe_id] = is_deleted
+    return (
+        [pk for pk, is_deleted in deleted.items() if not is_deleted],
+        [pk for pk, is_deleted in deleted.items() if is_deleted],
+        (moment, change_id, None),
+        has_more,
+    )
@@ -0,0 +1,98 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientToRecipe, Tag
+
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(color=(230, 140, 60)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 24), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com',
+        username=name,
+        first_name=name,
+        last_name=name,
+        password='password',
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS_ASYNC=False)
+class RecipeAPITestCase(APITestCase):
+    """
+    Тег, ингредиенты и автор для тестов API рецептов. Запросы выполняются
+    вместе с обработчиками on_commit, как после коммита в работающем
+    сервисе.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            ) for index in range(4)
+        ]
+        cls.author = create_user('author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, method, path, user=None, data=None):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(path, data, format='json')
+
+    def recipe_data(self, amounts, name='Рецепт', image=None):
+        return {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': image or make_image(),
+            'tags': [self.tag.id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in amounts.items()
+            ],
+        }
+
+    def create_recipe(self, amounts=None, name='Рецепт', image=None,
+                      author=None):
+        response = self.request(
+            'post', '/api/recipes/', author or self.author,
+            self.recipe_data(
+                amounts or {self.ingredients[0]: 10}, name, image
+            )
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def get_recipe_amounts(self, recipe_id):
+        return dict(IngredientToRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'))
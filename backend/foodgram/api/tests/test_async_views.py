@@ -0,0 +1,131 @@
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from foodgram.asgi import application
+from recipes.models import Favorite, Recipe
+from users.models import Subscribe
+from .base import create_user
+
+
+class AsyncViewsTest(TransactionTestCase):
+    """
+    Избранное, корзина и подписки под ASGI обслуживаются асинхронными
+    вьюхами и отвечают так же, как вьюсеты.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('author')
+        self.user = create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            image='recipes/images/recipe.png', cooking_time=10
+        )
+
+    def request(self, method, path, token=None):
+        """Запрос к ASGI-приложению: код ответа, заголовки и тело."""
+        headers = [(b'host', b'testserver')]
+        if token:
+            headers.append((b'authorization', f'Token {token}'.encode()))
+        path, _, query = path.partition('?')
+        return async_to_sync(self.communicate)({
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': headers,
+            'client': ('127.0.0.1', 1),
+            'server': ('testserver', 80),
+        })
+
+    async def communicate(self, scope):
+        communicator = ApplicationCommunicator(application, scope)
+        await communicator.send_input({
+            'type': 'http.request', 'body': b'', 'more_body': False
+        })
+        start = await communicator.receive_output(timeout=10)
+        body = b''
+        while True:
+            message = await communicator.receive_output(timeout=10)
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        headers = {
+            name.decode().lower(): value.decode()
+            for name, value in start['headers']
+        }
+        return start['status'], headers, json.loads(body) if body else None
+
+    def test_favorite_add_and_remove(self):
+        path = f'/api/recipes/{self.recipe.id}/favorite/'
+        status, _, data = self.request('POST', path, self.token.key)
+        self.assertEqual(status, 201)
+        self.assertEqual(data['id'], self.recipe.id)
+        self.assertEqual(
+            self.request('POST', path, self.token.key)[2],
+            {'errors': 'Рецепт уже добавлен!'}
+        )
+        self.assertEqual(
+            Recipe.objects.get(id=self.recipe.id).favorites_count, 1
+        )
+        self.assertEqual(self.request('DELETE', path, self.token.key)[0], 204)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_shopping_cart_missing_recipe(self):
+        status, _, data = self.request(
+            'POST', f'/api/recipes/{self.recipe.id + 1}/shopping_cart/',
+            self.token.key
+        )
+        self.assertEqual(status, 400)
+        self.assertEqual(data, {'errors': 'Несуществующий рецепт.'})
+
+    def test_errors(self):
+        path = f'/api/recipes/{self.recipe.id}/favorite/'
+        status, headers, data = self.request('POST', path)
+        self.assertEqual(status, 401)
+        self.assertEqual(headers['www-authenticate'], 'Token')
+        self.assertIn('detail', data)
+        status, _, data = self.request('POST', path, 'invalid')
+        self.assertEqual((status, list(data)), (401, ['detail']))
+        status, headers, data = self.request('GET', path, self.token.key)
+        self.assertEqual(status, 405)
+        self.assertEqual(headers['allow'], 'POST, DELETE')
+        self.assertIn('GET', data['detail'])
+        status, _, data = self.request(
+            'POST', f'/api/users/{self.author.id + 100}/subscribe/',
+            self.token.key
+        )
+        self.assertEqual((status, list(data)), (404, ['detail']))
+
+    def test_duplicate_subscribe(self):
+        path = f'/api/users/{self.author.id}/subscribe/?recipes_limit=1'
+        status, _, data = self.request('POST', path, self.token.key)
+        self.assertEqual(status, 201)
+        self.assertEqual(data['id'], self.author.id)
+        self.assertEqual(len(data['recipes']), 1)
+        status, _, data = self.request('POST', path, self.token.key)
+        self.assertEqual(status, 400)
+        self.assertEqual(data, {
+            'non_field_errors': ['Вы уже подписаны на этого пользователя!']
+        })
+        self.assertEqual(Subscribe.objects.count(), 1)
+        self.assertEqual(self.request('DELETE', path, self.token.key)[0], 204)
+        self.assertEqual(self.request('DELETE', path, self.token.key)[0], 400)
+
+    def test_other_urls_use_sync_views(self):
+        status, _, data = self.request(
+            'GET', f'/api/recipes/{self.recipe.id}/', self.token.key
+        )
+        self.assertEqual(status, 200)
+        self.assertIs(data['is_favorited'], False)
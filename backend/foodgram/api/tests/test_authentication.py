@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from .base import create_user
+
+
+@override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+class TokenInvalidationTest(APITestCase):
+    """
+    Отозванный токен перестает действовать и в процессах, где юзер
+    по токену остался в кэше процесса.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        self.key = self.token.key
+
+    def get_me(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+        return self.client.get('/api/users/me/')
+
+    def assertRevoked(self, revoke):
+        self.assertEqual(self.get_me().status_code, 200)
+        # Кэш процесса, который не выполнял отзыв.
+        other_process = dict(token_cache.items)
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke()
+        token_cache.items.update(other_process)
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_logout(self):
+        def logout():
+            response = self.client.post('/api/auth/token/logout/')
+            self.assertEqual(response.status_code, 204)
+
+        self.assertRevoked(logout)
+
+    def test_token_delete(self):
+        self.assertRevoked(self.token.delete)
+
+    def test_deactivated_user(self):
+        def deactivate():
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertRevoked(deactivate)
+
+    def test_cached_user_without_queries(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_me().status_code, 200)
@@ -0,0 +1,85 @@
+import gzip
+import json
+
+from api.ingredient_index import IngredientIndex
+from recipes.models import Ingredient, Tag
+from .base import RecipeAPITestCase
+
+
+class IngredientIndexTest(RecipeAPITestCase):
+    """Автодополнение: сначала совпадения по началу, затем по подстроке."""
+
+    def test_prefix_matches_before_contains_matches(self):
+        index = IngredientIndex([
+            (1, 'Баобаб', 'г'), (2, 'абрикос', 'г'), (3, 'Абажур', 'шт'),
+            (4, 'Крабы', 'г'), (5, 'Кабачок', 'г'), (6, 'Лук', 'г'),
+        ])
+        self.assertEqual(
+            [item['id'] for item in index.search('АБ')], [3, 2, 1, 5, 4]
+        )
+        self.assertEqual(
+            [item['name'] for item in index.search('')],
+            ['Абажур', 'абрикос', 'Баобаб', 'Кабачок', 'Крабы', 'Лук']
+        )
+        self.assertEqual(index.search('яблоко'), [])
+
+    def test_search_follows_catalog_changes(self):
+        for name in ('Сахарная пудра', 'Сахар', 'Тростниковый сахар'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+        url = '/api/ingredients/?name=сахар'
+        names = [item['name'] for item in self.request('get', url).data]
+        self.assertEqual(
+            names, ['Сахар', 'Сахарная пудра', 'Тростниковый сахар']
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Сахар ванильный',
+                                      measurement_unit='г')
+        names = [item['name'] for item in self.request('get', url).data]
+        self.assertEqual(names[:2], ['Сахар', 'Сахар ванильный'])
+
+
+class CatalogSnapshotTest(RecipeAPITestCase):
+    """Снимки справочников: ETag, 304 и gzip."""
+
+    def get(self, path, **headers):
+        self.client.force_authenticate(None)
+        return self.client.get(path, **headers)
+
+    def test_etag_and_not_modified(self):
+        for path in ('/api/tags/', '/api/ingredients/'):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertIn('max-age', response['Cache-Control'])
+                response = self.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(
+                    self.get(path, HTTP_IF_NONE_MATCH='"other"').status_code,
+                    200
+                )
+
+    def test_gzip(self):
+        plain = self.get('/api/tags/')
+        compressed = self.get('/api/tags/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(
+            compressed['ETag'], plain['ETag'][:-1] + '-gzip"'
+        )
+        self.assertEqual(self.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=compressed['ETag']
+        ).status_code, 304)
+        self.assertEqual(
+            json.loads(plain.content)[0]['slug'], self.tag.slug
+        )
+
+    def test_new_version_changes_etag(self):
+        etag = self.get('/api/tags/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        response = self.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 2)
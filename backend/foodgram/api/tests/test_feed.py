@@ -0,0 +1,98 @@
+from django.test import override_settings
+
+from recipes.models import FeedEntry
+from .base import RecipeAPITestCase, create_user
+
+
+class FeedTest(RecipeAPITestCase):
+    """Лента подписчика: раскладка новых рецептов, дозаполнение и очистка."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.follower = create_user('follower')
+
+    def get_feed(self, url='/api/recipes/feed/'):
+        response = self.request('get', url, self.follower)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_feed_ids(self, url='/api/recipes/feed/'):
+        return [recipe['id'] for recipe in self.get_feed(url)['results']]
+
+    def subscribe(self, method='post'):
+        return self.request(
+            method, f'/api/users/{self.author.id}/subscribe/', self.follower
+        )
+
+    def test_backfill_and_fan_out(self):
+        old = self.create_recipe(name='Старый рецепт')
+        self.subscribe()
+        self.assertEqual(self.get_feed_ids(), [old])
+        new = self.create_recipe(name='Новый рецепт')
+        self.assertEqual(self.get_feed_ids(), [new, old])
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.follower).count(), 2
+        )
+
+    def test_pages(self):
+        self.subscribe()
+        recipe_ids = [
+            self.create_recipe(name=f'Рецепт {index}') for index in range(3)
+        ]
+        first = self.get_feed('/api/recipes/feed/?limit=2')
+        self.assertEqual(
+            [recipe['id'] for recipe in first['results']], recipe_ids[:0:-1]
+        )
+        self.assertEqual(self.get_feed_ids(first['next']), recipe_ids[:1])
+        self.assertIsNone(self.get_feed(first['next'])['next'])
+
+    def test_prune_on_unsubscribe(self):
+        self.subscribe()
+        self.create_recipe()
+        self.assertEqual(self.subscribe('delete').status_code, 204)
+        self.assertEqual(self.get_feed_ids(), [])
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower).exists())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_is_pulled_on_read(self):
+        old = self.create_recipe(name='Старый рецепт')
+        self.subscribe()
+        self.author.refresh_from_db()
+        new = self.create_recipe(name='Новый рецепт')
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.follower, recipe_id=new
+        ).exists())
+        self.assertEqual(self.get_feed_ids(), [new, old])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_author_crosses_threshold(self):
+        other = create_user('other')
+        old = self.create_recipe(name='Старый рецепт')
+        self.subscribe()
+        self.request(
+            'post', f'/api/users/{self.author.id}/subscribe/', other
+        )
+        self.author.refresh_from_db()
+        popular = self.create_recipe(name='Рецепт популярного автора')
+        self.assertFalse(FeedEntry.objects.filter(recipe_id=popular).exists())
+        self.request(
+            'delete', f'/api/users/{self.author.id}/subscribe/', other
+        )
+        self.author.refresh_from_db()
+        fanned = self.create_recipe(name='Разложенный рецепт')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, recipe_id=fanned
+        ).exists())
+        self.assertEqual(self.get_feed_ids(), [fanned, popular, old])
+        self.request(
+            'post', f'/api/users/{self.author.id}/subscribe/', other
+        )
+        self.author.refresh_from_db()
+        pulled = self.create_recipe(name='Снова популярный автор')
+        self.assertEqual(
+            self.get_feed_ids(), [pulled, fanned, popular, old]
+        )
+        self.assertEqual(
+            self.get_feed_ids('/api/recipes/feed/?limit=2'), [pulled, fanned]
+        )
@@ -0,0 +1,71 @@
+from django.test import override_settings
+
+from recipes.images import prune_images
+from recipes.models import Recipe, StoredImage
+from recipes.storage import image_storage, variant_storage
+from .base import RecipeAPITestCase, make_image
+
+
+class StoredImageTest(RecipeAPITestCase):
+    """Файлы картинок хранятся один раз и удаляются, когда ссылок нет."""
+
+    def get_image(self, recipe_id):
+        return Recipe.objects.get(id=recipe_id).image.name
+
+    def get_refs(self, name):
+        return StoredImage.objects.get(name=name).refs
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_recipe(name='Первый')
+        second = self.create_recipe(name='Второй')
+        name = self.get_image(first)
+        self.assertEqual(self.get_image(second), name)
+        self.assertEqual(self.get_refs(name), 2)
+        self.assertTrue(StoredImage.objects.get(name=name).variants)
+
+    def test_release_on_delete_and_replace(self):
+        first = self.create_recipe(name='Первый')
+        second = self.create_recipe(name='Второй')
+        name = self.get_image(first)
+        self.request('delete', f'/api/recipes/{first}/', self.author)
+        self.assertEqual(self.get_refs(name), 1)
+        response = self.request(
+            'patch', f'/api/recipes/{second}/', self.author,
+            {'image': make_image((10, 20, 30))}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        replaced = self.get_image(second)
+        self.assertNotEqual(replaced, name)
+        self.assertEqual(self.get_refs(name), 0)
+        self.assertEqual(self.get_refs(replaced), 1)
+        self.assertTrue(image_storage.exists(name))
+
+    def test_prune_deletes_only_unreferenced_files(self):
+        first = self.create_recipe(name='Первый')
+        name = self.get_image(first)
+        variants = StoredImage.objects.get(name=name).variants
+        kept = self.get_image(self.create_recipe(
+            name='Второй', image=make_image((10, 20, 30))
+        ))
+        self.request('delete', f'/api/recipes/{first}/', self.author)
+        self.assertEqual(prune_images(), 0)
+        with override_settings(IMAGE_PRUNE_AGE=0):
+            self.assertEqual(prune_images(), 1)
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+        self.assertFalse(any(
+            variant_storage.exists(variant)
+            for formats in variants.values() for variant in formats.values()
+        ))
+        self.assertTrue(image_storage.exists(kept))
+
+    def test_upload_after_release_keeps_file(self):
+        first = self.create_recipe(name='Первый')
+        name = self.get_image(first)
+        self.request('delete', f'/api/recipes/{first}/', self.author)
+        second = self.create_recipe(name='Второй')
+        self.assertEqual(self.get_image(second), name)
+        with override_settings(IMAGE_PRUNE_AGE=0):
+            self.assertEqual(prune_images(), 0)
+        self.assertEqual(self.get_refs(name), 1)
+        self.assertTrue(image_storage.exists(name))
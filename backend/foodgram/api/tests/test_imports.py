@@ -0,0 +1,148 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+
+from api.imports import import_recipes
+from recipes.cache_versions import RECIPES_VERSION_KEY, get_cache_version
+from recipes.models import FeedEntry, Recipe, RecipeChange, StoredImage
+from users.models import Subscribe
+from .base import RecipeAPITestCase, User, create_user
+
+
+class ImportRecipesTest(RecipeAPITestCase):
+    """Массовый импорт: корректные рецепты создаются, ошибки по номерам."""
+
+    def setUp(self):
+        super().setUp()
+        self.valid = self.recipe_data({self.ingredients[0]: 10})
+
+    def post(self, items):
+        return self.request('post', '/api/recipes/bulk/', self.author, items)
+
+    def test_errors_are_reported_by_index(self):
+        response = self.post([
+            self.valid,
+            {**self.valid, 'cooking_time': 0},
+            {**self.valid, 'tags': [self.tag.id + 100]},
+            {**self.valid, 'ingredients': [{'id': 0, 'amount': 1}]},
+            {**self.valid, 'name': 'Второй рецепт'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 2)
+        errors = {
+            error['index']: set(error['errors'])
+            for error in response.data['errors']
+        }
+        self.assertEqual(errors, {
+            1: {'cooking_time'}, 2: {'tags'}, 3: {'ingredients'}
+        })
+        self.assertEqual(User.objects.get(id=self.author.id).recipes_count, 2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_nothing_created(self):
+        response = self.post([{**self.valid, 'cooking_time': 0}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual(response.data['errors'][0]['index'], 0)
+
+    def test_invalid_payload(self):
+        for items in ([], {'name': 'Рецепт'}):
+            with self.subTest(items=items):
+                self.assertEqual(self.post(items).status_code, 400)
+
+    @override_settings(RECIPES_IMPORT_MAX_ITEMS=1)
+    def test_too_many_items(self):
+        self.assertEqual(self.post([self.valid, self.valid]).status_code, 400)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_error_index_across_batches(self):
+        items = [
+            {**self.valid, 'name': f'Рецепт {index}'} for index in range(4)
+        ]
+        items[3]['cooking_time'] = 0
+        with self.captureOnCommitCallbacks(execute=True):
+            created, errors = import_recipes(items, self.author, batch_size=2)
+        self.assertEqual(len(created), 3)
+        self.assertEqual([error['index'] for error in errors], [3])
+
+
+def bulk_create_returning_ids(bulk_create):
+    """
+    bulk_create, который, как в Postgres, проставляет id созданным
+    объектам. SQLite в Django 3.2 этого не умеет.
+    """
+    def create(objs, *args, **kwargs):
+        bulk_create(objs, *args, **kwargs)
+        ids = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True
+        )[:len(objs)]
+        for obj, pk in zip(objs, reversed(ids)):
+            obj.pk = pk
+            obj._state.adding = False
+            obj._state.db = connection.alias
+        return objs
+    return create
+
+
+class ImportSideEffectsTest(RecipeAPITestCase):
+    """
+    Импорт через bulk_create (БД возвращает id вставленных строк) делает
+    то же, что сигналы при поштучном сохранении.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.follower = create_user('follower')
+        Subscribe.objects.create(user=self.follower, author=self.author)
+        self.items = [
+            {
+                **self.recipe_data({self.ingredients[0]: 10}),
+                'name': f'Рецепт {index}',
+            } for index in range(3)
+        ]
+
+    def import_recipes(self, can_return_rows):
+        version = get_cache_version(RECIPES_VERSION_KEY)
+        features = SimpleNamespace(
+            can_return_rows_from_bulk_insert=can_return_rows
+        )
+        with mock.patch(
+            'api.imports.connection', SimpleNamespace(features=features)
+        ), mock.patch.object(
+            Recipe.objects, 'bulk_create',
+            side_effect=bulk_create_returning_ids(Recipe.objects.bulk_create)
+        ) as bulk_create, self.captureOnCommitCallbacks(execute=True):
+            created, errors = import_recipes(self.items, self.author)
+        self.assertEqual(errors, [])
+        self.assertEqual(bulk_create.called, can_return_rows)
+        self.assertNotEqual(get_cache_version(RECIPES_VERSION_KEY), version)
+        return [recipe.id for recipe in created]
+
+    def assertSideEffects(self, recipe_ids):
+        self.assertEqual(
+            User.objects.get(id=self.author.id).recipes_count, len(recipe_ids)
+        )
+        self.assertEqual(set(FeedEntry.objects.filter(
+            user=self.follower
+        ).values_list('recipe_id', flat=True)), set(recipe_ids))
+        self.assertEqual(set(RecipeChange.objects.values_list(
+            'recipe_id', flat=True
+        )), set(recipe_ids))
+        names = set(Recipe.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(
+            StoredImage.objects.get(name=names.pop()).refs, len(recipe_ids)
+        )
+        for recipe in Recipe.objects.all():
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertIn(
+                self.ingredients[0].name.lower(), recipe.search_document
+            )
+
+    def test_bulk_insert_branch(self):
+        self.assertSideEffects(self.import_recipes(True))
+
+    def test_save_branch(self):
+        self.assertSideEffects(self.import_recipes(False))
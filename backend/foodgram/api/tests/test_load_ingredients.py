@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.cache_versions import INGREDIENTS_VERSION_KEY, get_cache_version
+from recipes.management.commands import load_ingredients
+from recipes.models import Ingredient
+
+
+class LoadIngredientsTest(TestCase):
+    """Загрузка ингредиентов из csv и json, повторная загрузка."""
+
+    rows = [
+        ('мука', 'г'), ('соль', 'г'), ('молоко', 'мл'), ('мука', 'г'),
+        ('яйца', 'шт'),
+    ]
+
+    def write(self, suffix, content):
+        file, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(file, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def write_csv(self, rows):
+        return self.write('.csv', ''.join(
+            f'{name},{unit}\n' for name, unit in rows
+        ))
+
+    def write_json(self, rows):
+        return self.write('.json', json.dumps([
+            {'name': name, 'measurement_unit': unit} for name, unit in rows
+        ], ensure_ascii=False, indent=2))
+
+    def load(self, path, *args):
+        stdout = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('load_ingredients', path, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def assertIngredients(self, rows):
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            set(rows)
+        )
+
+    def test_rerun_adds_only_new_ingredients(self):
+        version = get_cache_version(INGREDIENTS_VERSION_KEY)
+        self.assertIn('добавлено 4', self.load(self.write_csv(self.rows)))
+        self.assertNotEqual(
+            get_cache_version(INGREDIENTS_VERSION_KEY), version
+        )
+        output = self.load(self.write_csv(
+            self.rows + [('сахар', 'г')]
+        ), '--batch-size', '2')
+        self.assertIn('добавлено 1', output)
+        self.assertIngredients(self.rows + [('сахар', 'г')])
+
+    def test_json_is_read_in_chunks(self):
+        with mock.patch.object(load_ingredients, 'JSON_READ_SIZE', 16):
+            self.assertIn(
+                'добавлено 4', self.load(self.write_json(self.rows))
+            )
+        self.assertIngredients(self.rows)
+
+    def test_batch_fallback_splits_large_batches(self):
+        rows = [(f'ингредиент {number}', 'г') for number in range(30)]
+        with mock.patch(
+            'django.db.connection.ops.bulk_batch_size', return_value=7
+        ) as batch_size:
+            output = self.load(self.write_json(rows), '--no-copy')
+        self.assertTrue(batch_size.called)
+        self.assertIn('добавлено 30', output)
+        self.assertIngredients(rows)
+
+    def test_invalid_files(self):
+        for path in (
+            self.write('.json', '{"name": "мука"}'),
+            self.write('.json', '[{"name": "мука"'),
+            self.write('.txt', 'мука,г'),
+        ):
+            with self.subTest(path=path):
+                with self.assertRaises(CommandError):
+                    self.load(path)
+        self.assertFalse(Ingredient.objects.exists())
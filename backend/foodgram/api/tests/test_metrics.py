@@ -0,0 +1,69 @@
+import re
+
+from .base import RecipeAPITestCase, create_user
+
+
+class MetricsTest(RecipeAPITestCase):
+    """Метрики запросов собираются по маршрутам и доступны персоналу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = create_user('staff')
+        cls.staff.is_staff = True
+        cls.staff.save()
+
+    def get_metrics(self):
+        response = self.request('get', '/api/metrics/', self.staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def get_value(self, metrics, name, **labels):
+        pattern = re.escape(name) + r'\{' + ','.join(
+            f'{label}="{re.escape(str(value))}"'
+            for label, value in labels.items()
+        ) + r'\} (\S+)'
+        match = re.search(pattern, metrics)
+        return float(match.group(1)) if match else 0
+
+    def get_delta(self, before, after, name, **labels):
+        return (
+            self.get_value(after, name, **labels)
+            - self.get_value(before, name, **labels)
+        )
+
+    def test_requests_are_recorded(self):
+        labels = {'view': 'recipe-list', 'method': 'GET'}
+        before = self.get_metrics()
+        recipe_id = self.create_recipe()
+        for _ in range(2):
+            self.request('get', '/api/recipes/', self.author)
+        self.request('get', f'/api/recipes/{recipe_id + 1}/', self.author)
+        after = self.get_metrics()
+        for name, extra in (
+            ('foodgram_http_requests_total', {'status': 200}),
+            ('foodgram_http_request_duration_seconds_count', {}),
+            ('foodgram_db_queries_per_request_count', {}),
+            ('foodgram_http_response_size_bytes_count', {}),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.get_delta(before, after, name, **labels, **extra), 2
+                )
+        self.assertGreater(self.get_delta(
+            before, after, 'foodgram_db_queries_per_request_sum', **labels
+        ), 0)
+        self.assertEqual(self.get_delta(
+            before, after, 'foodgram_http_requests_total',
+            view='recipe-detail', method='GET', status=404
+        ), 1)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        response = self.request('get', '/api/metrics/', self.author)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn(
+            '# TYPE foodgram_http_requests_total counter', self.get_metrics()
+        )
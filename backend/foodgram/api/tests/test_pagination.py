@@ -0,0 +1,75 @@
+import base64
+import json
+
+from .base import RecipeAPITestCase
+
+
+class KeysetPaginationTest(RecipeAPITestCase):
+    """Вывод рецептов по ключу совпадает с обычным постраничным выводом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.names = ['Борщ', 'Алое', 'Вареники', 'Алое', 'Борщ', 'Гуляш',
+                     'Алое']
+
+    def setUp(self):
+        super().setUp()
+        for name in self.names:
+            self.create_recipe(name=name)
+        response = self.request('get', '/api/recipes/?limit=100', self.author)
+        self.expected = [recipe['id'] for recipe in response.data['results']]
+
+    def get_page(self, url):
+        response = self.request('get', url, self.author)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages_follow_list_order_without_gaps(self):
+        pages = []
+        url = '/api/recipes/?pagination=cursor&limit=3'
+        while url:
+            page = self.get_page(url)
+            pages.append([recipe['id'] for recipe in page['results']])
+            url = page['next']
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_first_and_last_page_boundaries(self):
+        first = self.get_page('/api/recipes/?pagination=cursor&limit=3')
+        self.assertIsNone(first['previous'])
+        self.assertIsNotNone(first['next'])
+        whole = self.get_page(
+            f'/api/recipes/?pagination=cursor&limit={len(self.names)}'
+        )
+        self.assertIsNone(whole['next'])
+        self.assertEqual(
+            [recipe['id'] for recipe in whole['results']], self.expected
+        )
+
+    def test_previous_link_returns_to_previous_page(self):
+        first = self.get_page('/api/recipes/?pagination=cursor&limit=3')
+        second = self.get_page(first['next'])
+        back = self.get_page(second['previous'])
+        self.assertEqual(
+            [recipe['id'] for recipe in back['results']],
+            [recipe['id'] for recipe in first['results']]
+        )
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.request(
+            'get', '/api/recipes/?cursor=invalid', self.author
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_invalid_values(self):
+        for values in (['a', 'abc'], ['a', {'id': 1}], [None, 1], 'ab', 1):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({'v': values, 'r': 0}).encode()
+            ).decode()
+            with self.subTest(values=values):
+                response = self.request(
+                    'get', f'/api/recipes/?cursor={cursor}', self.author
+                )
+                self.assertEqual(response.status_code, 404)
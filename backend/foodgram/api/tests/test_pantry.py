@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from api import pantry
+from api.pantry import PantryIndex, get_pantry_index
+from .base import RecipeAPITestCase
+
+
+class PantryIndexTest(RecipeAPITestCase):
+    """Подбор по продуктам и обновление индекса по журналу изменений."""
+
+    def setUp(self):
+        super().setUp()
+        pantry._index = None
+        self.addCleanup(setattr, pantry, '_index', None)
+
+    def match(self, *ingredients, max_missing=0):
+        return [
+            recipe_id for recipe_id, _, _ in get_pantry_index().match(
+                [ingredient.id for ingredient in ingredients], max_missing
+            )
+        ]
+
+    def test_match_order(self):
+        first, second, third, _ = self.ingredients
+        index = PantryIndex([(1, first.id), (1, second.id), (2, first.id),
+                             (3, first.id), (3, third.id)])
+        self.assertEqual(index.match([first.id, second.id]), [(1, 0, 2),
+                                                              (2, 0, 1)])
+        self.assertEqual(
+            index.match([first.id], max_missing=1),
+            [(2, 0, 1), (1, 1, 1), (3, 1, 1)]
+        )
+        index.set_recipe(1, [])
+        self.assertEqual(index.match([second.id]), [])
+
+    @override_settings(RECIPES_SYNC_LAG=0)
+    def test_index_follows_change_log(self):
+        first, second, third, _ = self.ingredients
+        soup = self.create_recipe({first: 100, second: 20}, 'Суп')
+        index = get_pantry_index()
+        self.assertEqual(self.match(first, second), [soup])
+        salad = self.create_recipe({second: 5, third: 1}, 'Салат')
+        self.request('patch', f'/api/recipes/{soup}/', self.author, {
+            'ingredients': [{'id': first.id, 'amount': 100}],
+        })
+        self.assertEqual(self.match(first), [soup])
+        self.assertEqual(self.match(second, third), [salad])
+        self.request('delete', f'/api/recipes/{salad}/', self.author)
+        self.assertEqual(self.match(second, third), [])
+        self.assertIs(get_pantry_index(), index)
+
+    @override_settings(RECIPES_SYNC_LAG=0)
+    def test_rebuild_after_many_changes(self):
+        first, second, _, _ = self.ingredients
+        index = get_pantry_index()
+        with mock.patch.object(pantry, 'PANTRY_REBUILD_CHANGES', 1):
+            recipe_ids = [
+                self.create_recipe({first: 1}, f'Рецепт {number}')
+                for number in range(2)
+            ]
+            self.assertEqual(sorted(self.match(first)), recipe_ids)
+        self.assertIsNot(get_pantry_index(), index)
+
+    @override_settings(RECIPES_SYNC_LAG=60)
+    def test_recent_changes_are_applied_again(self):
+        first, _, _, _ = self.ingredients
+        get_pantry_index()
+        applied = pantry._applied
+        recipe_id = self.create_recipe({first: 1})
+        self.assertEqual(self.match(first), [recipe_id])
+        self.assertEqual(pantry._applied, applied)
+        self.assertEqual(self.match(first), [recipe_id])
+
+    def test_api_filter(self):
+        first, second, third, _ = self.ingredients
+        soup = self.create_recipe({first: 100, second: 20}, 'Суп')
+        salad = self.create_recipe({second: 5, third: 1}, 'Салат')
+        response = self.request(
+            'get', f'/api/recipes/?ingredients={first.id},{second.id}'
+            '&max_missing=1', self.author
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [soup, salad]
+        )
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarks import ENDPOINTS, get_benchmark_context, run_benchmarks
+from api.fixtures import generate_fixture_data
+from recipes.cache_versions import (INGREDIENTS_VERSION_KEY,
+                                    RECIPES_VERSION_KEY, TAGS_VERSION_KEY)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS_ASYNC=False)
+class QueryBudgetTest(TestCase):
+    """Число SQL-запросов эндпоинтов не превышает бюджетов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_fixture_data(
+            users=30, recipes=120, tags=5, ingredients=60, seed=1
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.context = get_benchmark_context()
+
+    def test_endpoints_within_budget(self):
+        for result in run_benchmarks(self.context, repeat=2):
+            with self.subTest(endpoint=result['name']):
+                self.assertLess(result['status'], 400)
+                self.assertLessEqual(result['queries'], result['budget'])
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for name, path in (
+            ('recipes-list', '/api/recipes/'),
+            ('users-list', '/api/users/'),
+        ):
+            endpoint = next(
+                endpoint for endpoint in ENDPOINTS if endpoint.name == name
+            )
+            small, large = (
+                run_benchmarks(self.context, endpoints=(
+                    endpoint._replace(path=f'{path}?limit={limit}'),
+                ))[0]['queries']
+                for limit in (2, 30)
+            )
+            with self.subTest(endpoint=name):
+                self.assertEqual(small, large)
+
+    def test_cached_reads_use_process_versions(self):
+        paths = {
+            INGREDIENTS_VERSION_KEY:
+                f'/api/ingredients/?name={self.context["prefix"]}',
+            TAGS_VERSION_KEY: '/api/tags/',
+            RECIPES_VERSION_KEY: '/api/recipes/',
+        }
+        for key, path in paths.items():
+            self.client.get(path)
+            with self.subTest(path=path):
+                with self.assertNumQueries(0):
+                    self.client.get(path)
+                cache.delete(key)
+                with CaptureQueriesContext(connection) as captured:
+                    self.client.get(path)
+                self.assertEqual(len(captured), 1)
+                self.assertIn('recipes_cacheversion', captured[0]['sql'])
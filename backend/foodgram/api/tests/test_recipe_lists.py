@@ -0,0 +1,208 @@
+from recipes.models import (Favorite, IngredientToRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem)
+from recipes.signals import recipe_ingredients_changed
+from users.models import Subscribe
+from .base import RecipeAPITestCase, User, create_user
+
+
+class CountersTest(RecipeAPITestCase):
+    """Счетчики совпадают с числом строк после добавления и удаления."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.users = [create_user(f'user{index}') for index in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_id = self.create_recipe()
+        self.other_id = self.create_recipe(name='Другой рецепт')
+
+    def assertCounters(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.favorites_count,
+                Favorite.objects.filter(recipe=recipe).count()
+            )
+            self.assertEqual(
+                recipe.carts_count,
+                ShoppingCart.objects.filter(recipe=recipe).count()
+            )
+        for user in User.objects.all():
+            self.assertEqual(
+                user.followers_count,
+                Subscribe.objects.filter(author=user).count()
+            )
+            self.assertEqual(
+                user.recipes_count, Recipe.objects.filter(author=user).count()
+            )
+
+    def test_favorite_add_and_remove(self):
+        path = f'/api/recipes/{self.recipe_id}/favorite/'
+        for user in self.users:
+            self.assertEqual(self.request('post', path, user).status_code, 201)
+        self.assertEqual(self.request('post', path, self.users[0]).status_code,
+                         400)
+        self.assertEqual(
+            Recipe.objects.get(id=self.recipe_id).favorites_count, 3
+        )
+        self.assertEqual(
+            self.request('delete', path, self.users[0]).status_code, 204
+        )
+        self.assertEqual(
+            self.request('delete', path, self.users[0]).status_code, 400
+        )
+        self.assertEqual(
+            Recipe.objects.get(id=self.recipe_id).favorites_count, 2
+        )
+        self.assertCounters()
+
+    def test_batch_add_and_remove(self):
+        recipes = [self.recipe_id, self.other_id]
+        for path in ('/api/recipes/favorite/', '/api/recipes/shopping_cart/'):
+            with self.subTest(path=path):
+                response = self.request(
+                    'post', path, self.users[0],
+                    {'recipes': [self.recipe_id]}
+                )
+                self.assertEqual(len(response.data['added']), 1)
+                response = self.request(
+                    'post', path, self.users[0], {'recipes': recipes}
+                )
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.data['added']],
+                    [self.other_id]
+                )
+                self.assertCounters()
+                response = self.request(
+                    'delete', path, self.users[0], {'recipes': recipes}
+                )
+                self.assertEqual(response.data['deleted'], 2)
+                self.assertCounters()
+
+    def test_subscriptions_and_recipes(self):
+        path = f'/api/users/{self.author.id}/subscribe/'
+        for user in self.users:
+            self.assertEqual(self.request('post', path, user).status_code, 201)
+        self.assertEqual(
+            self.request('delete', path, self.users[1]).status_code, 204
+        )
+        self.assertEqual(User.objects.get(id=self.author.id).followers_count,
+                         2)
+        self.request('delete', f'/api/recipes/{self.other_id}/', self.author)
+        self.assertEqual(User.objects.get(id=self.author.id).recipes_count, 1)
+        self.assertCounters()
+
+
+class ShoppingListTest(RecipeAPITestCase):
+    """Сводный список покупок равен сумме ингредиентов рецептов корзины."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.buyer = create_user('buyer')
+
+    def setUp(self):
+        super().setUp()
+        first, second, third, _ = self.ingredients
+        self.soup = self.create_recipe({first: 100, second: 20}, 'Суп')
+        self.salad = self.create_recipe({second: 5, third: 1}, 'Салат')
+        for recipe_id in (self.soup, self.salad):
+            self.request(
+                'post', f'/api/recipes/{recipe_id}/shopping_cart/', self.buyer
+            )
+
+    def get_summary(self):
+        response = self.request(
+            'get', '/api/recipes/shopping_cart/summary/', self.buyer
+        )
+        self.assertEqual(response.status_code, 200)
+        return {item['id']: item['amount'] for item in response.data}
+
+    def get_expected(self):
+        expected = {}
+        for item in IngredientToRecipe.objects.filter(
+            recipe__shopping_recipe__user=self.buyer
+        ):
+            expected[item.ingredient_id] = (
+                expected.get(item.ingredient_id, 0) + item.amount
+            )
+        return expected
+
+    def test_aggregate_after_add(self):
+        first, second, third, _ = self.ingredients
+        self.assertEqual(
+            self.get_summary(), {first.id: 100, second.id: 25, third.id: 1}
+        )
+
+    def test_aggregate_after_recipe_edit(self):
+        first, second, _, fourth = self.ingredients
+        response = self.request(
+            'patch', f'/api/recipes/{self.soup}/', self.author,
+            {'ingredients': [
+                {'id': second.id, 'amount': 30},
+                {'id': fourth.id, 'amount': 2},
+            ]}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        summary = self.get_summary()
+        self.assertEqual(summary, self.get_expected())
+        self.assertNotIn(first.id, summary)
+        self.assertEqual(summary[second.id], 35)
+
+    def test_aggregate_after_recipe_delete(self):
+        self.request('delete', f'/api/recipes/{self.soup}/', self.author)
+        self.assertEqual(self.get_summary(), self.get_expected())
+        self.assertEqual(len(self.get_summary()), 2)
+
+    def test_aggregate_after_remove_from_cart(self):
+        self.request(
+            'delete', f'/api/recipes/{self.salad}/shopping_cart/', self.buyer
+        )
+        self.assertEqual(self.get_summary(), self.get_expected())
+        self.request(
+            'delete', f'/api/recipes/{self.soup}/shopping_cart/', self.buyer
+        )
+        self.assertEqual(self.get_summary(), {})
+        self.assertFalse(
+            ShoppingListItem.objects.filter(user=self.buyer).exists()
+        )
+
+    def download(self, etag=None):
+        self.client.force_authenticate(self.buyer)
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', **headers
+        )
+        content = b''.join(getattr(response, 'streaming_content', []))
+        return response, content.decode()
+
+    def assertDownloadChanged(self, etag, text):
+        response, content = self.download(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(text, content)
+        return response['ETag']
+
+    def test_download_follows_changes_outside_api(self):
+        first, second, _, _ = self.ingredients
+        response, _ = self.download()
+        etag = response['ETag']
+        self.assertEqual(self.download(etag)[0].status_code, 304)
+        item = IngredientToRecipe.objects.get(
+            recipe_id=self.soup, ingredient=second
+        )
+        item.amount = 45
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+            recipe_ingredients_changed.send(
+                sender=Recipe, recipe=Recipe.objects.get(id=self.soup),
+                deltas={second.id: 25}
+            )
+        etag = self.assertDownloadChanged(etag, f'{second.name} (г) - 50')
+        first.name = 'Мука'
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        etag = self.assertDownloadChanged(etag, 'Мука (г) - 100')
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(id=self.soup).delete()
+        self.assertNotIn('Мука', self.download(etag)[1])
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.db import connection
+
+from api.search import search_recipes
+from recipes.models import Recipe
+from .base import RecipeAPITestCase
+
+
+class SearchTest(RecipeAPITestCase):
+    """Поиск рецептов по названию, описанию и ингредиентам."""
+
+    def setUp(self):
+        super().setUp()
+        first, second, _, _ = self.ingredients
+        self.soup = self.create_recipe({first: 100}, 'Суп')
+        self.salad = self.create_recipe({second: 10}, 'Салат')
+
+    def search(self, query):
+        response = self.request(
+            'get', f'/api/recipes/?search={query}', self.author
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    @skipUnless(connection.vendor != 'postgresql', 'поиск без Postgres')
+    def test_every_word_is_required(self):
+        self.assertEqual(self.search('суп'), [self.soup])
+        self.assertEqual(self.search('САЛАТ описание'), [self.salad])
+        self.assertEqual(self.search('ингредиент 1'), [self.salad])
+        self.assertEqual(
+            sorted(self.search('описание')), sorted([self.soup, self.salad])
+        )
+        self.assertEqual(self.search('суп салат'), [])
+
+    def test_document_follows_ingredient_rename(self):
+        ingredient = self.ingredients[0]
+        ingredient.name = 'Свекла'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertIn(
+            'свекла', Recipe.objects.get(id=self.soup).search_document
+        )
+
+    def test_postgres_query_uses_index_expression(self):
+        postgres = {'default': SimpleNamespace(vendor='postgresql')}
+        with mock.patch('api.search.connections', postgres):
+            queryset = search_recipes(Recipe.objects.all(), 'суп')
+        sql = str(queryset.query)
+        vector = (
+            'to_tsvector(\'russian\', "recipes_recipe"."search_document")'
+        )
+        self.assertIn(f"{vector} @@ websearch_to_tsquery('russian', суп)", sql)
+        self.assertIn(f'ts_rank({vector}', sql)
+        self.assertIn('ORDER BY "search_rank" DESC', sql)
+
+    @skipUnless(connection.vendor == 'postgresql', 'нужен Postgres')
+    def test_postgres_ranks_matches(self):
+        self.assertEqual(self.search('суп'), [self.soup])
+        self.assertEqual(self.search('салат -суп'), [self.salad])
@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+from django.core.management import call_command
+from scipy import sparse
+
+from api.similarity import iter_similar_recipes, top_k
+from recipes.models import Favorite, SimilarRecipe
+from .base import RecipeAPITestCase, create_user
+
+
+class TopKTest(RecipeAPITestCase):
+    """Отбор k самых похожих столбцов для строк блока."""
+
+    def test_top_k_skips_diagonal_and_zeros(self):
+        block = sparse.csr_matrix(np.array([
+            [0.0, 0.9, 0.5, 0.7],
+            [0.4, 0.0, 0.0, 0.0],
+        ], dtype=np.float32))
+        rows, columns, scores = top_k(block, 1, 2)
+        self.assertEqual(rows.tolist(), [1, 1, 2])
+        self.assertEqual(columns.tolist(), [3, 2, 0])
+        np.testing.assert_allclose(scores, [0.7, 0.5, 0.4])
+
+
+class SimilarRecipesTest(RecipeAPITestCase):
+    """Похожие рецепты по избранному и общим ингредиентам."""
+
+    def setUp(self):
+        super().setUp()
+        first, second, third, fourth = self.ingredients
+        self.soup = self.create_recipe({first: 1, second: 1}, 'Суп')
+        self.borscht = self.create_recipe({first: 1, third: 1}, 'Борщ')
+        self.salad = self.create_recipe({fourth: 1}, 'Салат')
+        self.cake = self.create_recipe({fourth: 1, second: 1}, 'Торт')
+        for name in ('first', 'second'):
+            user = create_user(name)
+            for recipe_id in (self.soup, self.salad):
+                Favorite.objects.create(user=user, recipe_id=recipe_id)
+
+    def similar(self, batch_size=10, k=2):
+        return [
+            row for _, rows in iter_similar_recipes(k, 0.5, 0.5, 1, batch_size)
+            for row in rows
+        ]
+
+    def test_batches_do_not_change_result(self):
+        rows = self.similar()
+        self.assertEqual(self.similar(batch_size=1), rows)
+        best = {}
+        for recipe_id, similar_id, _ in rows:
+            self.assertNotEqual(recipe_id, similar_id)
+            best.setdefault(recipe_id, similar_id)
+        self.assertEqual(best[self.soup], self.salad)
+        self.assertEqual(
+            [similar for recipe, similar, _ in rows if recipe == self.borscht],
+            [self.soup]
+        )
+
+    def test_top_limits_rows(self):
+        rows = self.similar(k=1)
+        self.assertEqual(
+            sorted(recipe_id for recipe_id, _, _ in rows),
+            sorted([self.soup, self.borscht, self.salad, self.cake])
+        )
+
+    def test_command_and_endpoint(self):
+        for _ in range(2):
+            call_command(
+                'build_similar_recipes', '--top', '2', stdout=io.StringIO()
+            )
+        self.assertEqual(
+            SimilarRecipe.objects.filter(recipe_id=self.soup).count(), 2
+        )
+        response = self.request(
+            'get', f'/api/recipes/{self.soup}/similar/', self.author
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], self.salad)
+        response = self.request(
+            'get', f'/api/recipes/{self.cake + 1}/similar/', self.author
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,89 @@
+import datetime
+
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+
+from api.sync import encode_sync_cursor
+from .base import RecipeAPITestCase
+
+
+@override_settings(RECIPES_SYNC_LAG=0)
+class RecipeChangesTest(RecipeAPITestCase):
+    """Синхронизация рецептов по курсору журнала изменений."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_ids = [
+            self.create_recipe(name=f'Рецепт {index}') for index in range(5)
+        ]
+
+    def get_changes(self, url):
+        response = self.request('get', url, self.author)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def sync(self, cursor=None, limit=2):
+        """Все страницы изменений: измененные, удаленные и новый курсор."""
+        url = f'/api/recipes/changes/?limit={limit}'
+        if cursor:
+            url += f'&since={cursor}'
+        changed, deleted = [], []
+        while url:
+            page = self.get_changes(url)
+            changed += [recipe['id'] for recipe in page['changed']]
+            deleted += page['deleted']
+            url, cursor = page['next'], page['cursor']
+        return changed, deleted, cursor
+
+    def test_full_sync_returns_every_recipe_once(self):
+        changed, deleted, _ = self.sync()
+        self.assertEqual(changed, self.recipe_ids)
+        self.assertEqual(deleted, [])
+
+    def test_delta_after_cursor(self):
+        _, _, cursor = self.sync()
+        edited, removed = self.recipe_ids[:2]
+        self.request(
+            'patch', f'/api/recipes/{edited}/', self.author,
+            {'name': 'Новое название'}
+        )
+        self.request('delete', f'/api/recipes/{removed}/', self.author)
+        created = self.create_recipe(name='Новый рецепт')
+        changed, deleted, cursor = self.sync(cursor)
+        self.assertEqual(sorted(changed), sorted([edited, created]))
+        self.assertEqual(deleted, [removed])
+        self.assertEqual(self.sync(cursor)[:2], ([], []))
+
+    def test_created_and_deleted_recipe_is_a_tombstone(self):
+        _, _, cursor = self.sync()
+        recipe_id = self.create_recipe(name='Временный рецепт')
+        self.request('delete', f'/api/recipes/{recipe_id}/', self.author)
+        changed, deleted, _ = self.sync(cursor)
+        self.assertEqual(changed, [])
+        self.assertEqual(deleted, [recipe_id])
+
+    def test_recent_changes_wait_for_lag(self):
+        _, _, cursor = self.sync()
+        with self.settings(RECIPES_SYNC_LAG=60):
+            self.create_recipe(name='Новый рецепт')
+            changed, _, lagging = self.sync(cursor)
+        self.assertEqual(changed, [])
+        self.assertEqual(len(self.sync(lagging)[0]), 1)
+
+    def test_invalid_cursor(self):
+        response = self.request(
+            'get', '/api/recipes/changes/?since=invalid', self.author
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_expired_cursor(self):
+        cursor = encode_sync_cursor(
+            timezone.now() - datetime.timedelta(
+                days=settings.RECIPES_SYNC_MAX_AGE + 1
+            ), 0
+        )
+        response = self.request(
+            'get', f'/api/recipes/changes/?since={cursor}', self.author
+        )
+        self.assertEqual(response.status_code, 410)
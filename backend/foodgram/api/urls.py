@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUsersViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from .views import (CustomUsersViewSet, IngredientViewSet, MetricsView,
+                    RecipeViewSet, TagViewSet)
 
 
 api_router = DefaultRouter()
@@ -16,6 +16,7 @@ api_router.register(
 )
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(api_router.urls)),
     path('', include('djoser.urls')),
     path(r'auth/', include('djoser.urls.authtoken'))
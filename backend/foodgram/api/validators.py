@@ -1,25 +1,28 @@
-from django.shortcuts import get_object_or_404
 from rest_framework.validators import ValidationError
 
 
-def get_validate_ingredients(self, ingredients, model):
+def validate_ingredients_unique(ingredients):
     if not ingredients:
         raise ValidationError({
             'ingredients': 'Нужен хотя бы один ингредиент'
         })
-    ingredients_list = set()
-    for item in ingredients:
-        ingredient_in_db = model.objects.filter(id=item['id'])
-        if not ingredient_in_db.exists():
-            raise ValidationError({
-                'ingredients': 'Такого ингредиента не сущестует'
-            })
-        ingredient = get_object_or_404(model, id=item['id'])
-        if ingredient in ingredients_list:
-            raise ValidationError({
-                'ingredients': 'Ингредиенты не могут повторяться'
-            })
-        ingredients_list.add(ingredient)
+    ingredient_ids = [item['id'] for item in ingredients]
+    if len(set(ingredient_ids)) != len(ingredient_ids):
+        raise ValidationError({
+            'ingredients': 'Ингредиенты не могут повторяться'
+        })
+    return ingredients
+
+
+def get_validate_ingredients(self, ingredients, model):
+    validate_ingredients_unique(ingredients)
+    existing = model.objects.filter(
+        id__in=[item['id'] for item in ingredients]
+    ).count()
+    if existing != len(ingredients):
+        raise ValidationError({
+            'ingredients': 'Такого ингредиента не сущестует'
+        })
     return ingredients
 
 
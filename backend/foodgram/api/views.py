@@ -1,25 +1,46 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
-from rest_framework.permissions import (AllowAny, IsAuthenticated,
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from recipes.cache_versions import (INGREDIENTS_VERSION_KEY,
+                                    RECIPE_VERSION_KEY, RECIPES_VERSION_KEY,
+                                    TAGS_VERSION_KEY)
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Subscribe
 from users.serializers import CustomUserReadSerializer
+from .feed import get_feed_recipe_ids
 from .filters import IngredientFilter, RecipeFilter
+from .imports import import_recipes
+from .ingredient_index import get_ingredient_index
+from .metrics import registry
 from .pagination import CustomPagination
 from .permissions import IsAuthorOrReadOnly
+from .recipe_lists import add_recipes, remove_recipes
+from .response_cache import cache_anonymous_response
 from .serializers import (IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSerializer, RecipeShortSerializer,
+                          RecipeIdsSerializer, RecipeSerializer,
+                          RecipeShortSerializer, ShoppingListItemSerializer,
                           SubscribeSerializer, TagSerializer)
-from .services import get_shopping_file, method_switch
+from .services import (annotate_is_subscribed, get_recipes_queryset,
+                       get_shopping_file, get_subscriptions_queryset,
+                       method_switch)
+from .snapshots import get_catalog_snapshot, snapshot_response
+from .sync import (conditional_response, decode_sync_cursor,
+                   encode_sync_cursor, get_recipe_changes,
+                   get_recipe_validators, is_cursor_expired)
 
 
 User = get_user_model()
@@ -37,10 +58,30 @@ class CustomUsersViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserReadSerializer
     http_method_names = ['get', 'post', 'delete']
+    pagination_class = CustomPagination
     filter_backends = (SearchFilter,)
     search_fields = ('username',)
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return annotate_is_subscribed(queryset, self.request.user)
+        return queryset
+
+    def get_instance(self):
+        # На самого себя подписаться нельзя, поэтому флаг известен
+        # без запроса к БД.
+        user = self.request.user
+        user.is_subscribed = False
+        return user
+
+    def get_recipes_limit(self):
+        limit = self.request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            return int(limit)
+        return None
+
     @action(
         ['get'],
         permission_classes=(IsAuthenticated,),
@@ -69,6 +110,9 @@ class CustomUsersViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             Subscribe.objects.create(user=user, author=author)
+            serializer.instance = get_subscriptions_queryset(
+                user, self.get_recipes_limit()
+            ).get(pk=author.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -87,7 +131,9 @@ class CustomUsersViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(owner__user=user)
+        queryset = get_subscriptions_queryset(
+            user, self.get_recipes_limit()
+        ).filter(owner__user=user)
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             pages,
@@ -107,6 +153,20 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список ингредиентов отдается из индекса без обращения к БД,
+        полный список - готовым снимком с поддержкой If-None-Match.
+        """
+        name = request.query_params.get('name')
+        if name:
+            return Response(get_ingredient_index().search(name))
+        return snapshot_response(request, get_catalog_snapshot(
+            'ingredients',
+            INGREDIENTS_VERSION_KEY,
+            lambda: get_ingredient_index().search('')
+        ))
+
 
 class TagViewSet(ReadOnlyModelViewSet):
     """Вьюсет обрабатывает [GET] запросы на чтение тегов."""
@@ -116,6 +176,14 @@ class TagViewSet(ReadOnlyModelViewSet):
     pagination_class = None
     permission_classes = (AllowAny,)
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов отдается готовым снимком текущей версии."""
+        return snapshot_response(request, get_catalog_snapshot(
+            'tags',
+            TAGS_VERSION_KEY,
+            lambda: self.get_serializer(self.get_queryset(), many=True).data
+        ))
+
 
 class RecipeViewSet(ModelViewSet):
     """
@@ -125,8 +193,12 @@ class RecipeViewSet(ModelViewSet):
     Вьюсет расширен action-методами:
     favorite - добавление рецепта в избранное и удаление рецепта из избранного.
     shopping_cart - добавление рецепта в список покупок (корзину).
+    favorite_batch, shopping_cart_batch - добавление и удаление сразу
+    нескольких рецептов.
     download_shopping_cart - формирование и скачивание списка покупок из
     добавленных в корзину рецептов.
+    shopping_cart_summary - сводный список покупок в формате JSON.
+    changes - изменения рецептов после курсора для синхронизации.
     """
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
@@ -135,11 +207,31 @@ class RecipeViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return get_recipes_queryset(self.request.user)
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH'):
             return RecipeCreateSerializer
         return RecipeSerializer
 
+    @cache_anonymous_response(lambda kwargs: (
+        RECIPES_VERSION_KEY, TAGS_VERSION_KEY, INGREDIENTS_VERSION_KEY
+    ))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(get_recipe_validators)
+    @cache_anonymous_response(lambda kwargs: (
+        RECIPE_VERSION_KEY.format(kwargs['pk']),
+        TAGS_VERSION_KEY,
+        INGREDIENTS_VERSION_KEY,
+    ))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -156,36 +248,220 @@ class RecipeViewSet(ModelViewSet):
     def shopping_cart(self, request, pk):
         return method_switch(self, request, ShoppingCart, pk)
 
-    def add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def bulk(self, request):
+        """Массовое создание рецептов с ошибками по каждому рецепту."""
+        items = request.data
+        if not isinstance(items, list) or not items:
             return Response(
-                {'errors': 'Рецепт уже добавлен!'},
+                {'errors': 'Ожидается непустой список рецептов.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        recipe_ex = Recipe.objects.filter(id=pk)
-        if not recipe_ex.exists():
+        if len(items) > settings.RECIPES_IMPORT_MAX_ITEMS:
+            return Response(
+                {'errors': 'Слишком много рецептов в одном запросе.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        created, errors = import_recipes(
+            items, request.user, context={'request': request}
+        )
+        serializer = RecipeShortSerializer(
+            created, many=True, context={'request': request}
+        )
+        return Response(
+            {'created': serializer.data, 'errors': errors},
+            status=(
+                status.HTTP_201_CREATED if created
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """
+        Лента новых рецептов авторов, на которых подписан пользователь.
+        Следующая страница запрашивается параметром before.
+        """
+        before = request.query_params.get('before')
+        before = int(before) if before and before.isdigit() else None
+        limit = self.paginator.get_page_size(request)
+        recipe_ids = get_feed_recipe_ids(request.user, before, limit + 1)
+        recipes = get_recipes_queryset(request.user).in_bulk(
+            recipe_ids[:limit]
+        )
+        serializer = RecipeSerializer(
+            [recipes[pk] for pk in recipe_ids[:limit] if pk in recipes],
+            many=True,
+            context={'request': request}
+        )
+        next_link = None
+        if len(recipe_ids) > limit:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'before', recipe_ids[limit - 1]
+            )
+        return Response({'next': next_link, 'results': serializer.data})
+
+    @action(detail=False)
+    def changes(self, request):
+        """
+        Изменения рецептов для синхронизации клиентов: созданные
+        и измененные рецепты целиком и id удаленных. Клиент сохраняет
+        курсор из ответа и передает его параметром since.
+        """
+        since = request.query_params.get('since')
+        cursor = decode_sync_cursor(since) if since else None
+        if cursor is not None and is_cursor_expired(cursor):
+            return Response(
+                {'errors': 'Курсор устарел, нужна полная синхронизация.'},
+                status=status.HTTP_410_GONE
+            )
+        changed_ids, deleted_ids, cursor, has_more = get_recipe_changes(
+            cursor, self.paginator.get_page_size(request)
+        )
+        recipes = get_recipes_queryset(request.user).in_bulk(changed_ids)
+        serializer = RecipeSerializer(
+            [recipes[pk] for pk in changed_ids if pk in recipes],
+            many=True,
+            context={'request': request}
+        )
+        cursor = encode_sync_cursor(*cursor)
+        next_link = None
+        if has_more:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'since', cursor
+            )
+        return Response({
+            'cursor': cursor,
+            'next': next_link,
+            'changed': serializer.data,
+            'deleted': deleted_ids,
+        })
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        """
+        Похожие рецепты из таблицы, которую строит команда
+        build_similar_recipes. Существование рецепта проверяется только
+        при пустом списке похожих.
+        """
+        limit = self.paginator.get_page_size(request)
+        recipes = list(Recipe.objects.filter(
+            similar_to__recipe_id=pk
+        ).order_by('-similar_to__score')[:limit])
+        if not recipes:
+            get_object_or_404(Recipe, pk=pk)
+        serializer = RecipeShortSerializer(
+            recipes, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
+    def add_to(self, model, user, pk):
+        recipes = add_recipes(model, user, [pk])
+        if not recipes:
             return Response(
                 {'errors': 'Несуществующий рецепт.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        recipe = Recipe.objects.get(id=pk)
-        model.objects.create(user=user, recipe=recipe)
-        serializer = RecipeShortSerializer(recipe)
+        if recipes[0].added:
+            return Response(
+                {'errors': 'Рецепт уже добавлен!'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = RecipeShortSerializer(recipes[0])
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_from(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        if remove_recipes(model, user, [pk]):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Рецепт уже удален.'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    def batch_switch(self, request, model):
+        """
+        Добавляет или удаляет сразу несколько рецептов. Операции
+        идемпотентны: уже добавленные и уже удаленные рецепты
+        не считаются ошибкой.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = set(serializer.validated_data['recipes'])
+        if request.method == 'DELETE':
+            deleted = remove_recipes(model, request.user, recipe_ids)
+            return Response({'deleted': deleted})
+        recipes = add_recipes(model, request.user, recipe_ids)
+        serializer = RecipeShortSerializer(
+            [recipe for recipe in recipes if not recipe.added],
+            many=True,
+            context={'request': request}
+        )
+        return Response(
+            {
+                'added': serializer.data,
+                'missing': sorted(
+                    recipe_ids - {recipe.id for recipe in recipes}
+                ),
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_batch(self, request):
+        return self.batch_switch(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_batch(self, request):
+        return self.batch_switch(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        url_path='shopping_cart/summary',
+        url_name='shopping-cart-summary',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_summary(self, request):
+        """Сводный список покупок по всем рецептам в корзине."""
+        serializer = ShoppingListItemSerializer(
+            request.user.shopping_list.select_related(
+                'ingredient'
+            ).order_by('ingredient__name', 'ingredient__measurement_unit'),
+            many=True
+        )
+        return Response(serializer.data)
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
         return get_shopping_file(self, request)
+
+
+class MetricsView(APIView):
+    """Метрики процесса в формате Prometheus. Доступны только персоналу."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(), content_type='text/plain; version=0.0.4'
+        )
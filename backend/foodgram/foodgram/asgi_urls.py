@@ -0,0 +1,23 @@
+from django.urls import include, path, re_path
+
+from api import async_views
+
+
+urlpatterns = [
+    re_path(
+        r'^api/recipes/(?P<pk>[^/.]+)/favorite/$',
+        async_views.favorite,
+        name='recipe-favorite'
+    ),
+    re_path(
+        r'^api/recipes/(?P<pk>[^/.]+)/shopping_cart/$',
+        async_views.shopping_cart,
+        name='recipe-shopping-cart'
+    ),
+    re_path(
+        r'^api/users/(?P<id>[^/.]+)/subscribe/$',
+        async_views.subscribe,
+        name='users-subscribe'
+    ),
+    path('', include('foodgram.urls')),
+]
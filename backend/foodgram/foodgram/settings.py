@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,16 +62,24 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('POSTGRES_DB', 'django'),
-        'USER': os.getenv('POSTGRES_USER', 'django'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
-        'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'django'),
+            'USER': os.getenv('POSTGRES_USER', 'django'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', 5432)
+        }
     }
-}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,11 +114,29 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+# Кэш процесса (LocMemCache) не виден другим процессам, поэтому версии
+# кэшей при нем хранятся в БД, а процесс перечитывает их не чаще раза
+# в CACHE_VERSIONS_TTL секунд. В одном процессе версии можно держать
+# в кэше. В docker-compose используется общий кэш memcached.
+CACHE_SINGLE_PROCESS = os.getenv(
+    'CACHE_SINGLE_PROCESS', 'False'
+).lower() in ('true', '1', 't')
+CACHE_VERSIONS_TTL = 2
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -138,3 +165,54 @@ MAX_COOCK_TIME = 32_000
 LENGTH_TAG_COLOR = 7
 
 MAX_LENGTH_STRING_IN_ADMIN = 50
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60 * 24
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+CATALOG_CACHE_MAX_AGE = 60
+
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+
+# Записи журнала изменений вставляются после коммита одним запросом;
+# записи моложе RECIPES_SYNC_LAG секунд ждут, пока зафиксируются соседние.
+RECIPES_SYNC_LAG = 5
+RECIPES_SYNC_MAX_AGE = 30
+
+AUTH_TOKEN_CACHE_SIZE = 10_000
+AUTH_TOKEN_CACHE_TTL = 30
+AUTH_TOKEN_SHARED_CACHE = os.getenv(
+    'AUTH_TOKEN_SHARED_CACHE', 'False'
+).lower() in ('true', '1', 't')
+AUTH_TOKEN_SHARED_CACHE_TIMEOUT = 60 * 10
+
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+METRICS_QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+METRICS_SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024)
+
+PANTRY_MAX_RESULTS = 1000
+
+FEED_FANOUT_MAX_FOLLOWERS = 10_000
+FEED_BACKFILL_SIZE = 100
+
+SIMILAR_RECIPES_TOP_K = 10
+
+RECIPES_IMPORT_BATCH_SIZE = 500
+RECIPES_IMPORT_MAX_ITEMS = 5000
+RECIPES_BATCH_MAX_ITEMS = 1000
+
+IMAGE_VARIANTS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1280,
+}
+IMAGE_VARIANTS_DIR = 'recipes/variants'
+IMAGE_VARIANTS_QUALITY = 80
+# Файлы картинок без ссылок удаляются не раньше, чем через столько секунд
+# после последнего сохранения или освобождения.
+IMAGE_PRUNE_AGE = 60 * 60
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', 2))
+IMAGE_VARIANTS_ASYNC = os.getenv(
+    'IMAGE_VARIANTS_ASYNC', 'True'
+).lower() in ('true', '1', 't')
@@ -3,6 +3,23 @@ from django.contrib import admin
 
 from .models import (Favorite, Ingredient, IngredientToRecipe, Recipe,
                      ShoppingCart, Tag)
+from .signals import recipe_ingredients_changed
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """
+    Только просмотр: изменения этих строк в обход API и формы рецепта
+    не попали бы в списки покупок.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 class IngredientToRecipeAdmin(admin.TabularInline):
@@ -14,12 +31,23 @@ class IngredientToRecipeAdmin(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     inlines = (IngredientToRecipeAdmin,)
-    list_display = ('name', 'author', 'in_favorites')
+    list_display = ('name', 'author', 'favorites_count', 'carts_count')
     list_filter = ('author', 'name', 'tags')
 
-    @admin.display(description='В избранном')
-    def in_favorites(self, obj):
-        return obj.favorites.count()
+    def get_amounts(self, recipe):
+        return dict(recipe.ingredienttorecipe_set.values_list(
+            'ingredient_id', 'amount'
+        ))
+
+    def save_related(self, request, form, formsets, change):
+        amounts = self.get_amounts(form.instance)
+        super().save_related(request, form, formsets, change)
+        deltas = self.get_amounts(form.instance)
+        for ingredient_id, amount in amounts.items():
+            deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+        recipe_ingredients_changed.send(
+            sender=Recipe, recipe=form.instance, deltas=deltas
+        )
 
 
 @admin.register(Ingredient)
@@ -35,7 +63,7 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(IngredientToRecipe)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(ReadOnlyAdmin):
     list_display = ('recipe', 'ingredient', 'amount')
 
 
@@ -45,5 +73,5 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(ReadOnlyAdmin):
     list_display = ('user', 'recipe')
@@ -0,0 +1,117 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CacheVersion
+
+
+INGREDIENTS_VERSION_KEY = 'ingredients_version'
+RECIPES_VERSION_KEY = 'recipes_version'
+RECIPE_VERSION_KEY = 'recipe_version:{}'
+SHOPPING_CART_VERSION_KEY = 'shopping_cart_version:{}'
+TAGS_VERSION_KEY = 'tags_version'
+
+PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+VERSIONS_BATCH_SIZE = 500
+
+
+def is_cache_shared():
+    """
+    Общий ли кэш для всех процессов приложения. Кэш процесса общий,
+    только если приложение работает в одном процессе (CACHE_SINGLE_PROCESS).
+    """
+    return settings.CACHE_SINGLE_PROCESS or (
+        settings.CACHES['default']['BACKEND'] not in PROCESS_CACHE_BACKENDS
+    )
+
+
+def get_cache_versions(keys):
+    """
+    Версии наборов данных в порядке keys. Версии хранятся в общем кэше,
+    а если кэш у каждого процесса свой - в БД, иначе изменение в одном
+    процессе не сбросило бы кэши других. Прочитанные из БД версии процесс
+    держит в своем кэше CACHE_VERSIONS_TTL секунд: изменения из других
+    процессов видны с этой задержкой, свои - сразу. Если версии нет,
+    создается новая, что сбрасывает зависимые данные.
+    """
+    keys = list(keys)
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if not missing:
+        return [versions[key] for key in keys]
+    if is_cache_shared():
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+        versions.update(cache.get_many(missing))
+    else:
+        stored = dict(CacheVersion.objects.filter(
+            key__in=missing
+        ).values_list('key', 'version'))
+        created = [key for key in missing if key not in stored]
+        if created:
+            CacheVersion.objects.bulk_create([
+                CacheVersion(key=key, version=uuid.uuid4().hex)
+                for key in created
+            ], ignore_conflicts=True)
+            stored.update(CacheVersion.objects.filter(
+                key__in=created
+            ).values_list('key', 'version'))
+        cache.set_many(stored, timeout=settings.CACHE_VERSIONS_TTL)
+        versions.update(stored)
+    return [versions[key] for key in keys]
+
+
+def get_cache_version(key):
+    return get_cache_versions([key])[0]
+
+
+def bump_cache_version(*keys):
+    """
+    Меняет версии наборов данных, сбрасывая зависимые от них кэши.
+    Возвращает новые версии.
+    """
+    if is_cache_shared():
+        versions = {key: uuid.uuid4().hex for key in keys}
+        if versions:
+            cache.set_many(versions, timeout=None)
+        return versions
+    version = uuid.uuid4().hex
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), VERSIONS_BATCH_SIZE):
+        batch = keys[start:start + VERSIONS_BATCH_SIZE]
+        updated = CacheVersion.objects.filter(
+            key__in=batch
+        ).update(version=version)
+        if updated < len(batch):
+            CacheVersion.objects.bulk_create([
+                CacheVersion(key=key, version=version) for key in batch
+            ], ignore_conflicts=True)
+    versions = dict.fromkeys(keys, version)
+    cache.set_many(versions, timeout=settings.CACHE_VERSIONS_TTL)
+    return versions
+
+
+def get_shopping_cart_version(user_id):
+    """Версия корзины юзера. Меняется при каждом изменении корзины."""
+    return get_cache_version(SHOPPING_CART_VERSION_KEY.format(user_id))
+
+
+def bump_shopping_cart_version(*user_ids):
+    """Меняет версии корзин юзеров, сбрасывая кэш списков покупок."""
+    bump_cache_version(*(
+        SHOPPING_CART_VERSION_KEY.format(user_id) for user_id in user_ids
+    ))
+
+
+def bump_recipes_version(*recipe_ids):
+    """
+    Меняет общую версию рецептов и версии отдельных рецептов,
+    сбрасывая закэшированные ответы.
+    """
+    bump_cache_version(RECIPES_VERSION_KEY, *(
+        RECIPE_VERSION_KEY.format(recipe_id) for recipe_id in recipe_ids
+    ))
@@ -0,0 +1,22 @@
+from django.db import transaction
+
+from .models import RecipeChange
+
+
+CHANGES_BATCH_SIZE = 1000
+
+
+def log_recipe_changes(recipe_ids, deleted=False):
+    """
+    Записывает изменения рецептов в журнал после коммита. Запись
+    получает номер, когда изменение уже видно другим транзакциям,
+    и вставляется одним коротким запросом: долгая транзакция не может
+    вписать изменение позади курсора, который клиенты уже получили.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    transaction.on_commit(lambda: RecipeChange.objects.bulk_create([
+        RecipeChange(recipe_id=recipe_id, deleted=deleted)
+        for recipe_id in recipe_ids
+    ], batch_size=CHANGES_BATCH_SIZE))
@@ -0,0 +1,257 @@
+import datetime
+import io
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache_versions import bump_recipes_version
+from .changes import log_recipe_changes
+from .models import Recipe, StoredImage
+from .storage import image_storage, variant_storage
+
+
+IMAGE_VARIANT_FORMATS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpeg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANTS_WORKERS,
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def render_variants(source):
+    """
+    Уменьшенные копии картинки для всех размеров из IMAGE_VARIANTS.
+    Возвращает словарь {размер: {формат: имя файла в хранилище}}.
+    Копии хранятся по хэшу содержимого, как и сама картинка.
+    """
+    image = ImageOps.exif_transpose(Image.open(source))
+    image = image.convert('RGB')
+    variants = {}
+    for size, width in settings.IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        variants[size] = {}
+        for ext, (image_format, options) in IMAGE_VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(
+                buffer,
+                image_format,
+                quality=settings.IMAGE_VARIANTS_QUALITY,
+                **options
+            )
+            variants[size][ext] = variant_storage.save(
+                f'{settings.IMAGE_VARIANTS_DIR}/{size}.{ext}',
+                ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def get_variant_files(variants):
+    return {
+        name for formats in (variants or {}).values()
+        for name in formats.values()
+    }
+
+
+def delete_variants(variants):
+    for name in get_variant_files(variants):
+        variant_storage.delete(name)
+
+
+def acquire_images(names):
+    """
+    Увеличивает число ссылок на файлы картинок: names содержит имя
+    файла на каждый рецепт, который начал на него ссылаться.
+    """
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+    StoredImage.objects.bulk_create([
+        StoredImage(name=name) for name in counts
+    ], ignore_conflicts=True)
+    StoredImage.objects.filter(name__in=counts).update(refs=F('refs') + Case(
+        *(When(name=name, then=Value(count))
+          for name, count in counts.items()),
+        default=Value(0),
+        output_field=PositiveIntegerField()
+    ))
+
+
+def delete_image_files(name, variants):
+    """
+    Удаляет файл картинки и его копии, если за время транзакции
+    на файл снова не сослались.
+    """
+    if StoredImage.objects.filter(name=name).exists():
+        return
+    image_storage.delete(name)
+    delete_variants(variants)
+
+
+def release_image(name, variants=None):
+    """
+    Уменьшает число ссылок на файл картинки. Файл и его общие копии без
+    ссылок удаляет prune_images позже: новая загрузка того же файла
+    могла уже получить его имя. variants - копии рецепта: их удаляют,
+    если это собственные копии старого рецепта.
+    """
+    if not name:
+        return
+    StoredImage.objects.filter(name=name).update(
+        refs=Greatest(F('refs') - 1, 0), updated=timezone.now()
+    )
+    if not variants:
+        return
+    stored = StoredImage.objects.filter(name=name).values_list(
+        'variants', flat=True
+    ).first()
+    if variants != stored:
+        transaction.on_commit(lambda: delete_variants(variants))
+
+
+def prune_images():
+    """
+    Удаляет файлы картинок без ссылок, не менявшиеся IMAGE_PRUNE_AGE
+    секунд, вместе с их копиями. Строка удаляется условным DELETE, и
+    файлы удаляются до коммита: сохранение того же файла в это время
+    ждет блокировки и затем записывает файл заново. Возвращает число
+    удаленных файлов.
+    """
+    until = timezone.now() - datetime.timedelta(
+        seconds=settings.IMAGE_PRUNE_AGE
+    )
+    unused = StoredImage.objects.filter(refs=0, updated__lt=until)
+    pruned = 0
+    for pk, name, variants in unused.values_list('pk', 'name', 'variants'):
+        with transaction.atomic():
+            deleted, _ = unused.filter(pk=pk).delete()
+            if not deleted:
+                continue
+            image_storage.delete(name)
+            delete_variants(variants)
+            pruned += 1
+    return pruned
+
+
+def generate_image_variants(recipe_id):
+    """
+    Сохраняет в image_variants копии картинки рецепта. Копии общие для
+    всех рецептов с той же картинкой и создаются один раз на файл.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image:
+        return None
+    name = recipe.image.name
+    stored = StoredImage.objects.filter(name=name).first()
+    variants = stored.variants if stored is not None else {}
+    if not variants:
+        with recipe.image.open('rb') as source:
+            variants = render_variants(source)
+        StoredImage.objects.filter(name=name).update(variants=variants)
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=name
+    ).update(image_variants=variants, updated=timezone.now())
+    if updated:
+        bump_recipes_version(recipe_id)
+        log_recipe_changes([recipe_id])
+        if recipe.image_variants and recipe.image_variants != variants:
+            delete_variants(recipe.image_variants)
+    return variants
+
+
+def regenerate_image_variants(name):
+    """
+    Пересоздает копии файла картинки для всех рецептов с этим файлом,
+    например после изменения IMAGE_VARIANTS. Старые копии удаляются.
+    """
+    if not image_storage.exists(name):
+        return None
+    with image_storage.open(name, 'rb') as source:
+        variants = render_variants(source)
+    stale = get_variant_files(StoredImage.objects.filter(
+        name=name
+    ).values_list('variants', flat=True).first())
+    recipes = dict(Recipe.objects.filter(image=name).values_list(
+        'id', 'image_variants'
+    ))
+    for recipe_variants in recipes.values():
+        stale |= get_variant_files(recipe_variants)
+    StoredImage.objects.filter(name=name).update(variants=variants)
+    Recipe.objects.filter(id__in=recipes).update(
+        image_variants=variants, updated=timezone.now()
+    )
+    bump_recipes_version(*recipes)
+    log_recipe_changes(recipes)
+    for stale_name in stale - get_variant_files(variants):
+        variant_storage.delete(stale_name)
+    return variants
+
+
+def move_to_content_name(stored):
+    """
+    Переносит файл, загруженный до хранения по хэшу, под имя по хэшу
+    содержимого. Рецепты переходят на новый файл, старый удаляется.
+    Копии остаются прежними, пока их не пересоздадут.
+    """
+    if not image_storage.exists(stored.name):
+        return None
+    with image_storage.open(stored.name, 'rb') as source:
+        name = image_storage.save(stored.name, source)
+    if name == stored.name:
+        return None
+    with transaction.atomic():
+        recipe_ids = list(Recipe.objects.filter(
+            image=stored.name
+        ).values_list('id', flat=True))
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            image=name, updated=timezone.now()
+        )
+        acquire_images([name] * len(recipe_ids))
+        StoredImage.objects.filter(name=name, variants={}).update(
+            variants=stored.variants
+        )
+        stored.delete()
+        transaction.on_commit(lambda: bump_recipes_version(*recipe_ids))
+        log_recipe_changes(recipe_ids)
+        transaction.on_commit(lambda: delete_image_files(stored.name, {}))
+    return name
+
+
+def run_in_worker(recipe_id):
+    try:
+        generate_image_variants(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_variants(recipe_id):
+    """
+    Ставит генерацию копий картинки в фоновую очередь после фиксации
+    транзакции, не задерживая ответ на запрос.
+    """
+    def submit():
+        if settings.IMAGE_VARIANTS_ASYNC:
+            get_executor().submit(run_in_worker, recipe_id)
+        else:
+            generate_image_variants(recipe_id)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_image_variants, regenerate_image_variants
+from recipes.models import Recipe, StoredImage
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии для всех рецептов, а не только для '
+                 'рецептов без копий.'
+        )
+
+    def handle(self, **options):
+        if options['all']:
+            return self.regenerate()
+        recipes = Recipe.objects.exclude(image='').filter(image_variants={})
+        processed = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            if generate_image_variants(recipe_id):
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {processed}'
+        ))
+
+    def regenerate(self):
+        # Копии общие для всех рецептов с одним файлом, поэтому
+        # пересоздаются по одному разу на файл.
+        processed = 0
+        for name in StoredImage.objects.values_list(
+            'name', flat=True
+        ).iterator():
+            if regenerate_image_variants(name):
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано файлов: {processed}'
+        ))
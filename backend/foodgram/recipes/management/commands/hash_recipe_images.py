@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import move_to_content_name
+from recipes.models import StoredImage
+from recipes.storage import CONTENT_NAME_PATTERN
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки рецептов, загруженные до хранения по хэшу, '
+        'под имена по хэшу содержимого. Одинаковые файлы объединяются.'
+    )
+
+    def handle(self, **options):
+        moved = 0
+        for stored in StoredImage.objects.exclude(
+            name__regex=CONTENT_NAME_PATTERN
+        ).iterator():
+            if move_to_content_name(stored):
+                moved += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}'
+        ))
@@ -1,31 +1,186 @@
 import csv
+import io
+import json
+import re
+import time
+from itertools import islice
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.transaction import atomic
+from django.db import connection
+from django.db.transaction import atomic, on_commit
 
+from recipes.cache_versions import INGREDIENTS_VERSION_KEY, bump_cache_version
 from recipes.models import Ingredient
 
 
+JSON_READ_SIZE = 64 * 1024
+JSON_SEPARATOR = re.compile(r'[\s,]*')
+
+
+def read_csv(file):
+    for line in csv.reader(file, delimiter=','):
+        if line:
+            yield line[0], line[1]
+
+
+def read_json(file):
+    """
+    Потоковое чтение json-массива объектов {name, measurement_unit}:
+    файл читается частями, объекты разбираются по одному.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('ожидается json-массив ингредиентов')
+    position = 1
+    while True:
+        position = JSON_SEPARATOR.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_READ_SIZE)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+
+def iter_batches(rows, batch_size):
+    """Пачки уникальных пар (название, единица измерения)."""
+    rows = iter(rows)
+    while True:
+        batch = {
+            (name.strip(), unit.strip())
+            for name, unit in islice(rows, batch_size)
+        }
+        if not batch:
+            return
+        yield batch
+
+
+def copy_ingredients(batches, on_batch):
+    """
+    Быстрый путь для PostgreSQL: пачки загружаются через COPY во временную
+    таблицу, затем одним INSERT ... ON CONFLICT DO NOTHING.
+    """
+    table = Ingredient._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE ingredients_load '
+            '(name varchar(200), measurement_unit varchar(200)) '
+            'ON COMMIT DROP'
+        )
+        for batch in batches:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                'COPY ingredients_load (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            on_batch(len(batch))
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT DISTINCT name, measurement_unit FROM ingredients_load '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+        return cursor.rowcount
+
+
+def insert_ingredients(batches, on_batch):
+    """
+    Общий путь: пачки через INSERT ... ON CONFLICT с той же целью
+    конфликта, что и в copy_ingredients. Пропускаются только уже
+    существующие ингредиенты, остальные ошибки, например занятый id,
+    прерывают загрузку.
+    """
+    table = Ingredient._meta.db_table
+    fields = [
+        Ingredient._meta.get_field(name)
+        for name in ('name', 'measurement_unit')
+    ]
+    created = 0
+    with connection.cursor() as cursor:
+        for batch in batches:
+            batch = sorted(batch)
+            size = connection.ops.bulk_batch_size(fields, batch)
+            for start in range(0, len(batch), size):
+                chunk = batch[start:start + size]
+                values = ', '.join(['(%s, %s)'] * len(chunk))
+                cursor.execute(
+                    f'INSERT INTO {table} (name, measurement_unit) '
+                    f'VALUES {values} '
+                    'ON CONFLICT (name, measurement_unit) DO NOTHING',
+                    [value for pair in chunk for value in pair]
+                )
+                created += cursor.rowcount
+            on_batch(len(batch))
+    return created
+
+
 class Command(BaseCommand):
-    @atomic
+    help = (
+        'Загружает ингредиенты из csv или json. Уже существующие '
+        'ингредиенты пропускаются, поэтому загрузку можно повторять.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=f'{settings.BASE_DIR}/data/ingredients.csv'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла. По умолчанию определяется по расширению.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже в PostgreSQL.'
+        )
+
     def handle(self, **options):
-        try:
-            with open(
-                f'{settings.BASE_DIR}/data/ingredients.csv',
-                encoding='utf-8'
-            ) as csv_file:
-                reader = csv.reader(csv_file, delimiter=",")
-                Ingredient.objects.bulk_create([
-                    Ingredient(
-                        id=num,
-                        name=line[0],
-                        measurement_unit=line[1]
-                    ) for num, line in enumerate(reader)
-                ])
-            self.stdout.write(self.style.SUCCESS(
-                'Загрузка данных в БД прошла успешно'
-            ))
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла {path}')
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        started = time.monotonic()
+        read = 0
 
+        def on_batch(size):
+            nonlocal read
+            read += size
+            self.stdout.write(
+                f'Обработано {read} ингредиентов', ending='\r'
+            )
+
+        try:
+            with open(path, encoding='utf-8') as file, atomic():
+                batches = iter_batches(
+                    READERS[file_format](file), options['batch_size']
+                )
+                load = copy_ingredients if use_copy else insert_ingredients
+                created = load(batches, on_batch)
+                on_commit(
+                    lambda: bump_cache_version(INGREDIENTS_VERSION_KEY)
+                )
         except Exception as error:
             raise CommandError(f'Во время загрузки произошла ошибка {error}')
+        elapsed = time.monotonic() - started
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка данных в БД прошла успешно: обработано {read}, '
+            f'добавлено {created} за {elapsed:.2f} с '
+            f'({read / max(elapsed, 1e-6):.0f} в секунду)'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import prune_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы картинок рецептов, на которые не ссылается ни один '
+        'рецепт дольше IMAGE_PRUNE_AGE секунд, вместе с их копиями.'
+    )
+
+    def handle(self, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {prune_images()}'
+        ))
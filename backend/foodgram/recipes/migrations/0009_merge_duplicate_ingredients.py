@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-17 06:13
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientToRecipe = apps.get_model('recipes', 'IngredientToRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        count=Count('id'), kept_id=Min('id')
+    ).filter(count__gt=1).order_by()
+    for group in duplicates:
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['kept_id']).values_list('id', flat=True))
+        for item in IngredientToRecipe.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ):
+            kept = IngredientToRecipe.objects.filter(
+                recipe_id=item.recipe_id, ingredient_id=group['kept_id']
+            ).first()
+            if kept is None:
+                item.ingredient_id = group['kept_id']
+                item.save(update_fields=['ingredient'])
+            else:
+                kept.amount += item.amount
+                kept.save(update_fields=['amount'])
+                item.delete()
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similar_recipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-17 06:35
+
+from django.db import migrations, models
+from django.db.models import Count
+import recipes.storage
+
+
+def fill_stored_images(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    StoredImage = apps.get_model('recipes', 'StoredImage')
+    variants = {}
+    for name, image_variants in Recipe.objects.exclude(
+        image_variants={}
+    ).values_list('image', 'image_variants').iterator():
+        variants.setdefault(name, image_variants)
+    StoredImage.objects.bulk_create([
+        StoredImage(
+            name=item['image'],
+            refs=item['refs'],
+            variants=variants.get(item['image'], {}),
+        ) for item in Recipe.objects.exclude(image='').values(
+            'image'
+        ).annotate(refs=Count('id')).order_by().iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('variants', models.JSONField(blank=True, default=dict, verbose_name='Уменьшенные копии')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/images', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_stored_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='id рецепта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Рецепт удален')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата записи')),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Журнал изменений рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.DeleteModel(
+            name='DeletedRecipe',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-17 09:40
+
+from django.core.management.color import no_style
+from django.db import migrations
+
+
+def reset_ingredient_sequence(apps, schema_editor):
+    # Прежняя загрузка ингредиентов вставляла явные id, и последовательность
+    # PostgreSQL осталась в начале. Для других СУБД запросов нет.
+    connection = schema_editor.connection
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), [Ingredient]
+        ):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            reset_ingredient_sequence, migrations.RunPython.noop
+        ),
+    ]
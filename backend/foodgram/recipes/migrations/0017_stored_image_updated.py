@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-17 10:05
+
+from django.db import migrations, models
+import django.utils.timezone
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_reset_ingredient_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedimage',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ImageStorage(), upload_to='recipes/images', verbose_name='Картинка'),
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
 
+from .storage import image_storage
+
 
 User = get_user_model()
 
@@ -16,6 +18,12 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -58,7 +66,15 @@ class Recipe(models.Model):
     )
     name = models.CharField('Название', max_length=200)
     text = models.TextField('Описание',)
-    image = models.ImageField('Картинка', upload_to='recipes/images')
+    image = models.ImageField(
+        'Картинка', upload_to='recipes/images', storage=image_storage
+    )
+    image_variants = models.JSONField(
+        'Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления',
         validators=[
@@ -82,11 +98,33 @@ class Recipe(models.Model):
         through_fields=('recipe', 'ingredient'),
         verbose_name='Ингредиенты',
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        'В корзинах', default=0, editable=False
+    )
+    search_document = models.TextField(
+        'Поисковый документ', default='', blank=True, editable=False
+    )
+    created = models.DateTimeField(
+        'Дата создания', auto_now_add=True, db_index=True
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
-        ordering = ('name',)
+        ordering = ('name', 'id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(fields=('name', 'id'), name='recipe_name_id_idx'),
+            models.Index(
+                fields=('author', '-id'), name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=('updated', 'id'), name='recipe_updated_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name[:settings.MAX_LENGTH_STRING_IN_ADMIN]
@@ -187,3 +225,184 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user.username} - {self.recipe.name}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Строка сводного списка покупок: сколько ингредиента нужно для всех
+    рецептов в корзине пользователя. Изменяется на разницу при каждом
+    изменении корзины и ингредиентов рецептов в ней.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        ordering = ('user',)
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.ingredient} - {self.amount}'
+
+
+class StoredImage(models.Model):
+    """
+    Файл картинки рецепта в хранилище по хэшу содержимого: сколько
+    рецептов на него ссылается и его уменьшенные копии. Файл и копии
+    без ссылок удаляет команда prune_recipe_images.
+    """
+
+    name = models.CharField('Файл', max_length=255, unique=True)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
+    variants = models.JSONField(
+        'Уменьшенные копии', default=dict, blank=True
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+
+    class Meta:
+        ordering = ('name',)
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return f'{self.name} - {self.refs}'
+
+
+class RecipeChange(models.Model):
+    """
+    Запись журнала изменений рецептов для синхронизации клиентов.
+    Пишется после коммита изменения, поэтому номера записей растут
+    в порядке, в котором изменения становятся видны.
+    """
+
+    recipe_id = models.BigIntegerField('id рецепта')
+    deleted = models.BooleanField('Рецепт удален', default=False)
+    created = models.DateTimeField(
+        'Дата записи', auto_now_add=True, db_index=True
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Журнал изменений рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id} - {self.created}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты: рецепт автора, на которого подписан пользователь."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+
+    class Meta:
+        ordering = ('user', '-recipe')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = (
+            models.Index(
+                fields=('user', '-recipe'), name='feed_user_recipe_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'), name='feed_user_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user.username} - {self.recipe.name}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт, рассчитанный командой build_similar_recipes."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'), name='similar_recipe_score_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe.name} - {self.similar.name}'
+
+
+class CacheVersion(models.Model):
+    """
+    Версия набора данных для кэшей, если кэш у каждого процесса свой:
+    версии в БД видны всем процессам.
+    """
+
+    key = models.CharField('Ключ', max_length=255, unique=True)
+    version = models.CharField('Версия', max_length=32)
+
+    class Meta:
+        ordering = ('key',)
+        verbose_name = 'Версия кэша'
+        verbose_name_plural = 'Версии кэшей'
+
+    def __str__(self):
+        return f'{self.key} - {self.version}'
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Ингредиенты рецепта изменены в обход API, например в админке.
+# Аргументы: recipe и deltas - изменения количеств {ингредиент: разница}.
+recipe_ingredients_changed = Signal()
@@ -0,0 +1,71 @@
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+
+CONTENT_NAME_PATTERN = r'/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла - хэш его содержимого:
+    <папка>/<первые два символа хэша>/<хэш>.<расширение>.
+    Одинаковые файлы хранятся один раз, а содержимое по одному адресу
+    никогда не меняется, поэтому ответы можно кэшировать навсегда.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        digest = digest.hexdigest()
+        return os.path.join(directory, digest[:2], digest + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return self.save_content(
+            self.get_content_name(name, content), content, max_length
+        )
+
+    def save_content(self, name, content, max_length=None):
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+class ImageStorage(ContentAddressedStorage):
+    """
+    Хранилище картинок рецептов. Файл проверяется и при необходимости
+    записывается под блокировкой строки StoredImage, время изменения
+    которой обновляется: команда prune_recipe_images не удалит его
+    одновременно с сохранением и в течение IMAGE_PRUNE_AGE секунд после.
+    """
+
+    def save_content(self, name, content, max_length=None):
+        StoredImage = apps.get_model('recipes', 'StoredImage')
+        with transaction.atomic(savepoint=False):
+            StoredImage.objects.bulk_create(
+                [StoredImage(name=name)], ignore_conflicts=True
+            )
+            StoredImage.objects.filter(name=name).update(
+                updated=timezone.now()
+            )
+            return super().save_content(name, content, max_length)
+
+
+image_storage = ImageStorage()
+variant_storage = ContentAddressedStorage()
@@ -5,7 +5,10 @@ from .models import Subscribe, User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('email', 'first_name', 'last_name', 'username')
+    list_display = (
+        'email', 'first_name', 'last_name', 'username',
+        'recipes_count', 'followers_count',
+    )
     list_filter = ('email', 'first_name')
 
 
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-17 07:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_popular_authors(apps, schema_editor):
+    # Рецепты популярных авторов могли не раскладываться по лентам.
+    apps.get_model('users', 'User').objects.filter(
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).update(feed_pull_from=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_username_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_pull_from',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Рецепты, не разложенные по лентам, начиная с id'),
+        ),
+        migrations.RunPython(mark_popular_authors, migrations.RunPython.noop),
+    ]
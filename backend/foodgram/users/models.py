@@ -15,11 +15,26 @@ class User(AbstractUser):
         validators=(username_validator,),
     )
     email = models.EmailField('Адрес электронной почты', unique=True)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
+    feed_pull_from = models.PositiveIntegerField(
+        'Рецепты, не разложенные по лентам, начиная с id',
+        null=True, blank=True, editable=False
+    )
 
     class Meta:
-        ordering = ('username',)
+        ordering = ('username', 'id')
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = (
+            models.Index(
+                fields=('username', 'id'), name='user_username_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.username
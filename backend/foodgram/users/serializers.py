@@ -25,6 +25,8 @@ class CustomUserReadSerializer(UserSerializer):
         write_only_fields = ('password',)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_anonymous:
             return False